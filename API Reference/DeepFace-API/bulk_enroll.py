@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+FacePay Bulk Enrollment
+Enrolls a directory of users in-process through the same batched pipeline
+as /register-face, with one worker per CPU core by default.
+
+Expected layout (one folder per user, up to 5 images each):
+
+    customers/
+    ├── user1/  front.jpg side.jpg
+    └── user2/  photo.jpg
+
+Wallets come from a CSV with `userId,walletAddress` rows (--wallets) or a
+`wallet.txt` file inside each user folder. Re-running with the same --db
+skips users that completed or are still queued there, resumes their
+queued jobs and retries users whose jobs failed.
+
+Usage:
+    python bulk_enroll.py customers/ --wallets wallets.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+from enrollment_queue import EnrollmentQueue
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+MAX_IMAGES_PER_USER = 5
+
+
+def load_wallets(path: str) -> dict:
+    wallets = {}
+    with open(path, newline="") as wallet_file:
+        for row in csv.reader(wallet_file):
+            if len(row) >= 2 and row[0] and row[0] != "userId":
+                wallets[row[0].strip()] = row[1].strip()
+    return wallets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll a directory of users")
+    parser.add_argument("users_dir", help="Directory with one sub-folder of images per user")
+    parser.add_argument("--wallets", default=None, help="CSV of userId,walletAddress")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch-size", type=int, default=16, help="Users per detection/DB batch")
+    parser.add_argument("--db", default="bulk_enrollment.db", help="Job database (for resuming)")
+    args = parser.parse_args()
+
+    # Imported here so --help works without loading DeepFace/TensorFlow
+    from main import process_enrollment_batch
+
+    wallets = load_wallets(args.wallets) if args.wallets else {}
+    queue = EnrollmentQueue(process_enrollment_batch, db_path=args.db,
+                            workers=args.workers, batch_size=args.batch_size)
+    # Jobs left queued by an interrupted run are resumed, not submitted again
+    already_done = queue.known_users()
+    resumed_ids = queue.pending_ids()
+
+    submitted_ids, skipped = [], 0
+    for user_id in sorted(os.listdir(args.users_dir)):
+        user_dir = os.path.join(args.users_dir, user_id)
+        if not os.path.isdir(user_dir):
+            continue
+        if user_id in already_done:
+            skipped += 1
+            continue
+
+        wallet = wallets.get(user_id)
+        wallet_path = os.path.join(user_dir, "wallet.txt")
+        if not wallet and os.path.exists(wallet_path):
+            with open(wallet_path) as wallet_file:
+                wallet = wallet_file.read().strip()
+        if not wallet:
+            print(f"⚠️ No wallet for {user_id}, skipping")
+            continue
+
+        image_names = sorted(
+            f for f in os.listdir(user_dir) if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS
+        )[:MAX_IMAGES_PER_USER]
+        if not image_names:
+            print(f"⚠️ No images for {user_id}, skipping")
+            continue
+
+        uploads = []
+        for name in image_names:
+            with open(os.path.join(user_dir, name), "rb") as image_file:
+                uploads.append((name, image_file.read()))
+        submitted_ids.append(queue.submit(user_id, wallet, uploads))
+
+    submitted, resumed = len(submitted_ids), len(resumed_ids)
+    print(f"📥 Queued {submitted} users ({skipped} already enrolled or queued, {resumed} resumed), "
+          f"{args.workers} workers, batch {args.batch_size}")
+    if not submitted and not resumed:
+        return
+
+    started = time.time()
+    queue.start()
+    queue.wait_until_idle()
+    queue.stop()
+    elapsed = time.time() - started
+
+    # Only this run's jobs: failures from earlier runs were already reported
+    counts = queue.counts(submitted_ids + resumed_ids)
+    print(f"\n📊 Bulk enrollment finished in {elapsed:.1f}s ({(submitted + resumed) / elapsed:.2f} users/s)")
+    print(f"   Completed: {counts.get('completed', 0)}")
+    print(f"   Failed: {counts.get('failed', 0)}")
+    sys.exit(1 if counts.get("failed") else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+FacePay Threshold Calibration
+Embeds a labelled image directory once per model, then evaluates every
+genuine/impostor pair with blocked NumPy matrix operations and reports
+FAR/FRR/ROC and a recommended threshold per model and distance metric.
+
+Expected layout (one folder per person):
+
+    faces/
+    ├── alice/  img1.jpg img2.jpg ...
+    └── bob/    img1.jpg ...
+
+Usage:
+    python calibrate_threshold.py faces/ --models VGG-Face,Facenet --target-far 0.001
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+METRICS = ("cosine", "euclidean", "euclidean_l2")
+
+# Thresholds currently in use, reported for comparison
+CURRENT_THRESHOLDS = {
+    "main.py CONFIDENCE_THRESHOLD": 0.4,
+    "face_recognition.py default": 0.68,
+}
+
+
+def list_labelled_images(image_dir: str) -> Tuple[List[str], np.ndarray, List[str]]:
+    """Return image paths, integer labels and the label names"""
+    paths, labels, names = [], [], []
+    for name in sorted(os.listdir(image_dir)):
+        person_dir = os.path.join(image_dir, name)
+        if not os.path.isdir(person_dir):
+            continue
+        person_images = [
+            os.path.join(person_dir, f) for f in sorted(os.listdir(person_dir))
+            if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS
+        ]
+        if not person_images:
+            continue
+        names.append(name)
+        paths.extend(person_images)
+        labels.extend([len(names) - 1] * len(person_images))
+    return paths, np.asarray(labels, dtype=np.int32), names
+
+
+def embed_images(paths: List[str], model_name: str, detector: str, cache_dir: str) -> np.ndarray:
+    """Embed every image once, into a memory-mapped .npy cache.
+
+    Detection is enforced like in the API, so images where no face is found
+    (or embedding fails) get NaN rows and are excluded later instead of
+    calibrating on whole-image embeddings. Re-running with the same image
+    list reuses the cache.
+    """
+    from deepface import DeepFace
+
+    os.makedirs(cache_dir, exist_ok=True)
+    safe_model = model_name.replace("/", "_")
+    # "detected": caches from before detection was enforced are not reused
+    cache_path = os.path.join(cache_dir, f"{safe_model}_{detector}_detected_embeddings.npy")
+    manifest_path = os.path.join(cache_dir, f"{safe_model}_{detector}_detected_manifest.txt")
+
+    if os.path.exists(cache_path) and os.path.exists(manifest_path):
+        with open(manifest_path) as manifest:
+            if manifest.read().splitlines() == paths:
+                print(f"♻️ Reusing cached {model_name} embeddings: {cache_path}")
+                return np.load(cache_path, mmap_mode="r")
+
+    print(f"🧠 Embedding {len(paths)} images with {model_name}...")
+    embeddings = None
+    started = time.time()
+
+    for i, path in enumerate(paths):
+        try:
+            result = DeepFace.represent(
+                img_path=path,
+                model_name=model_name,
+                detector_backend=detector,
+                enforce_detection=True
+            )
+            vector = np.asarray(result[0]["embedding"], dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️ Embedding failed for {path}: {e}")
+            vector = None
+
+        if embeddings is None and vector is not None:
+            # Allocate once the dimensionality is known; every earlier row failed
+            embeddings = np.lib.format.open_memmap(
+                cache_path, mode="w+", dtype=np.float32, shape=(len(paths), vector.shape[0])
+            )
+            embeddings[:i] = np.nan
+        if embeddings is not None:
+            embeddings[i] = vector if vector is not None else np.nan
+
+        if (i + 1) % 100 == 0:
+            rate = (i + 1) / (time.time() - started)
+            print(f"   {i + 1}/{len(paths)} images ({rate:.1f} img/s)")
+
+    if embeddings is None:
+        raise RuntimeError(f"No image could be embedded with {model_name}")
+
+    embeddings.flush()
+    with open(manifest_path, "w") as manifest:
+        manifest.write("\n".join(paths))
+    return np.load(cache_path, mmap_mode="r")
+
+
+def _block_distances(a: np.ndarray, b: np.ndarray, metric: str) -> np.ndarray:
+    """Pairwise distances between two blocks of (already prepared) rows"""
+    if metric == "euclidean":
+        sq = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2.0 * (a @ b.T)
+        return np.sqrt(np.maximum(sq, 0.0))
+    similarity = a @ b.T  # rows are L2-normalised for cosine / euclidean_l2
+    if metric == "cosine":
+        return 1.0 - similarity
+    return np.sqrt(np.maximum(2.0 - 2.0 * similarity, 0.0))
+
+
+def pair_histograms(embeddings: np.ndarray, labels: np.ndarray, metric: str,
+                    bins: int, block_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Histogram genuine and impostor distances over all unordered pairs.
+
+    Only one block_size x block_size distance tile is alive at a time, so
+    memory stays bounded regardless of gallery size.
+    """
+    valid = ~np.isnan(np.asarray(embeddings[:, 0]))
+    index = np.flatnonzero(valid)
+    labels = labels[index]
+    n = len(index)
+
+    def prepared(rows: np.ndarray) -> np.ndarray:
+        block = np.asarray(embeddings[rows], dtype=np.float32)
+        if metric != "euclidean":
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            block = block / np.maximum(norms, 1e-12)
+        return block
+
+    if metric == "euclidean":
+        max_norm = 0.0
+        for start in range(0, n, block_size):
+            block = prepared(index[start:start + block_size])
+            max_norm = max(max_norm, float(np.linalg.norm(block, axis=1).max()))
+        upper = 2.0 * max_norm
+    else:
+        upper = 2.0
+    edges = np.linspace(0.0, upper, bins + 1)
+
+    genuine = np.zeros(bins, dtype=np.int64)
+    impostor = np.zeros(bins, dtype=np.int64)
+
+    for i_start in range(0, n, block_size):
+        i_rows = slice(i_start, min(i_start + block_size, n))
+        a = prepared(index[i_rows])
+        a_labels = labels[i_rows]
+
+        for j_start in range(i_start, n, block_size):
+            j_rows = slice(j_start, min(j_start + block_size, n))
+            b = a if j_start == i_start else prepared(index[j_rows])
+            distances = np.clip(_block_distances(a, b, metric), 0.0, upper)
+
+            same = a_labels[:, None] == labels[j_rows][None, :]
+            if j_start == i_start:
+                # Diagonal tile: keep each unordered pair once, drop self-pairs
+                upper_triangle = np.triu(np.ones(distances.shape, dtype=bool), k=1)
+                genuine += np.histogram(distances[same & upper_triangle], bins=edges)[0]
+                impostor += np.histogram(distances[~same & upper_triangle], bins=edges)[0]
+            else:
+                genuine += np.histogram(distances[same], bins=edges)[0]
+                impostor += np.histogram(distances[~same], bins=edges)[0]
+
+    return genuine, impostor, edges
+
+
+def error_rates(genuine: np.ndarray, impostor: np.ndarray, edges: np.ndarray,
+                target_far: float, report_thresholds: Dict[str, float], roc_points: int) -> dict:
+    """FAR/FRR curves from the histograms (a pair matches when distance <= threshold)"""
+    thresholds = edges[1:]
+    total_genuine = max(int(genuine.sum()), 1)
+    total_impostor = max(int(impostor.sum()), 1)
+
+    far = np.cumsum(impostor) / total_impostor          # impostors accepted
+    frr = 1.0 - np.cumsum(genuine) / total_genuine      # genuines rejected
+    tar = 1.0 - frr
+
+    eer_index = int(np.argmin(np.abs(far - frr)))
+    allowed = np.flatnonzero(far <= target_far)
+    target_index = int(allowed[-1]) if len(allowed) else 0
+
+    def rates_at(threshold: float) -> dict:
+        i = min(int(np.searchsorted(thresholds, threshold)), len(thresholds) - 1)
+        return {"threshold": threshold, "far": float(far[i]), "frr": float(frr[i])}
+
+    sample = np.unique(np.linspace(0, len(thresholds) - 1, roc_points).astype(int))
+    return {
+        "genuine_pairs": int(genuine.sum()),
+        "impostor_pairs": int(impostor.sum()),
+        "recommended_threshold": float(thresholds[target_index]),
+        "recommended": {
+            "target_far": target_far,
+            "far": float(far[target_index]),
+            "frr": float(frr[target_index]),
+        },
+        "eer": {
+            "threshold": float(thresholds[eer_index]),
+            "rate": float((far[eer_index] + frr[eer_index]) / 2),
+        },
+        "auc": float(np.sum(np.diff(far, prepend=0.0) * tar)),
+        "current_thresholds": {name: rates_at(value) for name, value in report_thresholds.items()},
+        "roc": [
+            {"threshold": float(thresholds[i]), "far": float(far[i]), "tar": float(tar[i])}
+            for i in sample
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate face match thresholds from a labelled image directory")
+    parser.add_argument("image_dir", help="Directory with one sub-folder of images per person")
+    parser.add_argument("--models", default=os.getenv("DEEPFACE_MODEL", "VGG-Face"),
+                        help="Comma-separated DeepFace models (default: DEEPFACE_MODEL or VGG-Face)")
+    parser.add_argument("--metrics", default=",".join(METRICS), help="Comma-separated distance metrics")
+    parser.add_argument("--detector", default=os.getenv("DEEPFACE_DETECTOR", "opencv"))
+    parser.add_argument("--target-far", type=float, default=0.001,
+                        help="Highest acceptable false accept rate for the recommendation")
+    parser.add_argument("--block-size", type=int, default=2048, help="Rows per distance tile")
+    parser.add_argument("--bins", type=int, default=4000, help="Histogram resolution per metric")
+    parser.add_argument("--roc-points", type=int, default=200)
+    parser.add_argument("--cache-dir", default=".calibration_cache")
+    parser.add_argument("--output", default="calibration_report.json")
+    args = parser.parse_args()
+
+    paths, labels, names = list_labelled_images(args.image_dir)
+    if len(names) < 2:
+        print("❌ Need at least two people (sub-folders) to measure impostor pairs")
+        sys.exit(1)
+    print(f"📁 {len(paths)} images of {len(names)} people")
+
+    report = {"image_dir": args.image_dir, "images": len(paths), "people": len(names), "models": {}}
+
+    for model_name in [m.strip() for m in args.models.split(",") if m.strip()]:
+        embeddings = embed_images(paths, model_name, args.detector, args.cache_dir)
+        report["models"][model_name] = {}
+
+        for metric in [m.strip() for m in args.metrics.split(",") if m.strip()]:
+            if metric not in METRICS:
+                print(f"⚠️ Unknown metric {metric}, skipping")
+                continue
+            started = time.time()
+            genuine, impostor, edges = pair_histograms(embeddings, labels, metric, args.bins, args.block_size)
+            result = error_rates(genuine, impostor, edges, args.target_far, CURRENT_THRESHOLDS, args.roc_points)
+            result["seconds"] = time.time() - started
+            report["models"][model_name][metric] = result
+
+            print(f"📊 {model_name} / {metric}: threshold {result['recommended_threshold']:.4f} "
+                  f"(FAR {result['recommended']['far']:.5f}, FRR {result['recommended']['frr']:.4f}), "
+                  f"EER {result['eer']['rate']:.4f} @ {result['eer']['threshold']:.4f}")
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"✅ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
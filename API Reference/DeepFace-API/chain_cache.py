@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+FacePay Chain Read Cache
+Cuts RPC round trips per checkout: one pooled Web3 connection per RPC URL,
+short-TTL token balances invalidated when our own transactions are mined,
+memoised token decimals and a periodically refreshed EIP-1559 fee oracle.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+
+BALANCE_TTL_SECONDS = 10.0
+FEE_REFRESH_SECONDS = 12.0  # about one Sepolia block
+FALLBACK_PRIORITY_FEE_GWEI = 1
+
+_web3_instances: Dict[str, Web3] = {}
+_web3_lock = threading.Lock()
+
+
+def get_web3(rpc_url: str, pool_size: int = 20, timeout: float = 10.0) -> Web3:
+    """Shared Web3 per RPC URL, backed by a keep-alive connection pool"""
+    with _web3_lock:
+        web3 = _web3_instances.get(rpc_url)
+        if web3 is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            web3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": timeout}, session=session))
+            _web3_instances[rpc_url] = web3
+        return web3
+
+
+class TTLCache:
+    """Minimal thread-safe key/value cache with per-entry expiry.
+
+    Every invalidation bumps the key's version. A reader that takes
+    `version(key)` before a slow fetch and passes it to `set` won't cache
+    its value if the key was invalidated in the meantime.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Any, tuple] = {}
+        self._versions: Dict[Any, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def version(self, key) -> tuple:
+        with self._lock:
+            return self._epoch, self._versions.get(key, 0)
+
+    def set(self, key, value, version: Optional[tuple] = None) -> bool:
+        """Store `value`; with `version`, only if the key wasn't invalidated since"""
+        with self._lock:
+            if version is not None and version != (self._epoch, self._versions.get(key, 0)):
+                return False
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            return True
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+
+class ChainReader:
+    """Cached ERC-20 reads for a single token contract"""
+
+    def __init__(self, web3: Web3, token_contract, balance_ttl: float = BALANCE_TTL_SECONDS):
+        self.web3 = web3
+        self.token_contract = token_contract
+        self.balances = TTLCache(balance_ttl)
+        self._decimals: Optional[int] = None
+        self._decimals_lock = threading.Lock()
+
+    def decimals(self) -> int:
+        """Token decimals never change, so read them once"""
+        if self._decimals is None:
+            with self._decimals_lock:
+                if self._decimals is None:
+                    self._decimals = self.token_contract.functions.decimals().call()
+        return self._decimals
+
+    def balance_of_wei(self, address: str) -> int:
+        key = address.lower()
+        balance = self.balances.get(key)
+        if balance is None:
+            # A receipt invalidating this address mid-read makes the result stale
+            version = self.balances.version(key)
+            balance = self.token_contract.functions.balanceOf(
+                self.web3.to_checksum_address(address)
+            ).call()
+            self.balances.set(key, balance, version)
+        return balance
+
+    def balance_of(self, address: str) -> float:
+        """Token balance in whole units"""
+        return self.balance_of_wei(address) / (10 ** self.decimals())
+
+    def allowance_of(self, owner: str, spender: str) -> float:
+        """Allowance in whole units (not cached: PaymentHub charges spend it)"""
+        allowance = self.token_contract.functions.allowance(
+            self.web3.to_checksum_address(owner),
+            self.web3.to_checksum_address(spender)
+        ).call()
+        return allowance / (10 ** self.decimals())
+
+    def invalidate_balance(self, address: str):
+        self.balances.invalidate(address.lower())
+
+    def attach(self, executor):
+        """Drop cached balances of every address a mined transaction touched"""
+        def on_receipt(payment, receipt):
+            for address in payment.touched_addresses:
+                self.invalidate_balance(address)
+        executor.add_receipt_listener(on_receipt)
+
+
+class FeeOracle:
+    """EIP-1559 fee parameters refreshed in the background.
+
+    `params()` never blocks on RPC after the first refresh, so it can be
+    passed straight to PaymentExecutor as `fee_params`. Chains without a
+    base fee fall back to a cached legacy `gasPrice`.
+    """
+
+    def __init__(self, web3: Web3, refresh_seconds: float = FEE_REFRESH_SECONDS,
+                 base_fee_multiplier: float = 2.0):
+        self.web3 = web3
+        self.refresh_seconds = refresh_seconds
+        self.base_fee_multiplier = base_fee_multiplier
+        self._params: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> dict:
+        latest = self.web3.eth.get_block('latest')
+        base_fee = latest.get('baseFeePerGas')
+
+        if base_fee is None:
+            params = {'gasPrice': self.web3.eth.gas_price}
+        else:
+            try:
+                priority_fee = self.web3.eth.max_priority_fee
+            except Exception:
+                priority_fee = self.web3.to_wei(FALLBACK_PRIORITY_FEE_GWEI, 'gwei')
+            params = {
+                'maxPriorityFeePerGas': priority_fee,
+                # Headroom so a few base-fee increases don't strand the tx
+                'maxFeePerGas': int(base_fee * self.base_fee_multiplier) + priority_fee,
+            }
+
+        with self._lock:
+            self._params = params
+        return params
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Fee refresh failed, keeping previous estimate: {e}")
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self.refresh()
+                self._thread = threading.Thread(target=self._refresh_loop, name="fee-oracle", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def params(self) -> dict:
+        with self._lock:
+            params = self._params
+        if params is None:
+            self.start()
+            with self._lock:
+                params = self._params
+        return dict(params)
@@ -2,6 +2,8 @@
 -- Run this in Supabase SQL editor after deleting existing tables
 
 -- Drop existing tables if they exist
+DROP TABLE IF EXISTS face_model_embeddings;
+DROP TABLE IF EXISTS app_settings;
 DROP TABLE IF EXISTS face_embeddings;
 DROP TABLE IF EXISTS payment_logs;
 
@@ -18,6 +20,31 @@ CREATE TABLE face_embeddings (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Create face_model_embeddings table: one embedding per user per model.
+-- Back-filled by reembed_job.py so a new model can be indexed while the
+-- active one keeps serving traffic
+CREATE TABLE face_model_embeddings (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES face_embeddings(user_id) ON DELETE CASCADE,
+    model_name TEXT NOT NULL,
+    embedding JSONB NOT NULL, -- Array of floats
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    UNIQUE (user_id, model_name)
+);
+
+-- Create app_settings table: active/shadow model switched at runtime
+CREATE TABLE app_settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO app_settings (key, value) VALUES
+('active_model', 'VGG-Face'),
+('active_threshold', '0.4'),
+('active_model_indexed', 'false'),
+('shadow_model', '');
+
 -- Create payment_logs table for transaction history (optional)
 CREATE TABLE payment_logs (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -30,6 +57,7 @@ CREATE TABLE payment_logs (
     transaction_hash TEXT,
     status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'confirmed', 'failed')),
     face_confidence FLOAT,
+    batch_id TEXT, -- Set when settled through PaymentHub.chargeBatch
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -37,9 +65,11 @@ CREATE TABLE payment_logs (
 CREATE INDEX idx_face_embeddings_user_id ON face_embeddings(user_id);
 CREATE INDEX idx_face_embeddings_wallet ON face_embeddings(wallet_address);
 CREATE INDEX idx_face_embeddings_type ON face_embeddings(user_type);
+CREATE INDEX idx_face_model_embeddings_model ON face_model_embeddings(model_name, user_id);
 CREATE INDEX idx_payment_logs_from_user ON payment_logs(from_user_id);
 CREATE INDEX idx_payment_logs_to_user ON payment_logs(to_user_id);
 CREATE INDEX idx_payment_logs_status ON payment_logs(status);
+CREATE INDEX idx_payment_logs_batch ON payment_logs(batch_id);
 
 -- Create updated_at trigger function
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -55,9 +85,15 @@ CREATE TRIGGER update_face_embeddings_updated_at
     BEFORE UPDATE ON face_embeddings 
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_app_settings_updated_at 
+    BEFORE UPDATE ON app_settings 
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
 -- Enable Row Level Security (RLS) - optional but recommended
 ALTER TABLE face_embeddings ENABLE ROW LEVEL SECURITY;
 ALTER TABLE payment_logs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE face_model_embeddings ENABLE ROW LEVEL SECURITY;
+ALTER TABLE app_settings ENABLE ROW LEVEL SECURITY;
 
 -- Create policies for service role access (adjust as needed)
 CREATE POLICY "Service role can manage face_embeddings" ON face_embeddings
@@ -66,6 +102,12 @@ CREATE POLICY "Service role can manage face_embeddings" ON face_embeddings
 CREATE POLICY "Service role can manage payment_logs" ON payment_logs
     FOR ALL USING (auth.role() = 'service_role');
 
+CREATE POLICY "Service role can manage face_model_embeddings" ON face_model_embeddings
+    FOR ALL USING (auth.role() = 'service_role');
+
+CREATE POLICY "Service role can manage app_settings" ON app_settings
+    FOR ALL USING (auth.role() = 'service_role');
+
 -- Insert sample data for testing (optional)
 INSERT INTO face_embeddings (user_id, wallet_address, face_data, user_type) VALUES
 ('sample_user', '0x0000000000000000000000000000000000000000', 'sample_base64_data', 'consumer');
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+FacePay Enrollment Queue
+SQLite-backed job queue for face registration. Uploads are spooled to disk
+and acknowledged with a job ID; a pool of worker threads claims queued jobs
+in batches and hands each batch to a processing function.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+ENROLLMENT_DB_PATH = os.getenv("ENROLLMENT_DB_PATH", "enrollment_jobs.db")
+ENROLLMENT_SPOOL_DIR = os.getenv("ENROLLMENT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "facepay-enrollment"))
+FINISH_ATTEMPTS = 3
+SUPERSEDED_ERROR = "Superseded by a newer registration"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS enrollment_jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    wallet_address TEXT NOT NULL,
+    image_paths TEXT NOT NULL,      -- JSON list of spooled files
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'processing', 'completed', 'failed')),
+    result TEXT,                    -- JSON
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_enrollment_jobs_status ON enrollment_jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_enrollment_jobs_user ON enrollment_jobs(user_id, status);
+"""
+
+
+class EnrollmentJob:
+    """A claimed job handed to the batch processor"""
+
+    def __init__(self, job_id: str, user_id: str, wallet_address: str, image_paths: List[str]):
+        self.id = job_id
+        self.user_id = user_id
+        self.wallet_address = wallet_address
+        self.image_paths = image_paths
+
+
+# process_batch(jobs) -> {job_id: (result_dict, None) or (None, error_message)}
+BatchProcessor = Callable[[List[EnrollmentJob]], Dict[str, Tuple[Optional[dict], Optional[str]]]]
+
+
+class EnrollmentQueue:
+    def __init__(self, process_batch: BatchProcessor, db_path: str = ENROLLMENT_DB_PATH,
+                 spool_dir: str = ENROLLMENT_SPOOL_DIR, workers: int = 2, batch_size: int = 8,
+                 poll_interval: float = 0.5):
+        self.process_batch = process_batch
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self.worker_count = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+        os.makedirs(spool_dir, exist_ok=True)
+        self._local = threading.local()
+        self._claim_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._workers: List[threading.Thread] = []
+
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    # Producer side
+
+    def submit(self, user_id: str, wallet_address: str, images: List[Tuple[str, bytes]]) -> str:
+        """Spool the images and queue a job; returns the job ID"""
+        job_id = str(uuid.uuid4())
+        job_dir = os.path.join(self.spool_dir, job_id)
+        os.makedirs(job_dir)
+
+        image_paths = []
+        for i, (filename, content) in enumerate(images):
+            extension = os.path.splitext(filename or "")[1] or ".jpg"
+            path = os.path.join(job_dir, f"{i}{extension}")
+            with open(path, "wb") as image_file:
+                image_file.write(content)
+            image_paths.append(path)
+
+        now = datetime.now().isoformat()
+        self._connect().execute(
+            "INSERT INTO enrollment_jobs (id, user_id, wallet_address, image_paths, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, user_id, wallet_address, json.dumps(image_paths), now, now)
+        )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._connect().execute("SELECT * FROM enrollment_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "jobId": row["id"],
+            "userId": row["user_id"],
+            "walletAddress": row["wallet_address"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "createdAt": row["created_at"],
+            "updatedAt": row["updated_at"],
+        }
+
+    def counts(self, job_ids: Optional[List[str]] = None) -> Dict[str, int]:
+        """Jobs per status, over the whole queue or only the given job IDs"""
+        if job_ids is None:
+            rows = self._connect().execute(
+                "SELECT status, COUNT(*) AS n FROM enrollment_jobs GROUP BY status"
+            ).fetchall()
+            return {row["status"]: row["n"] for row in rows}
+
+        counts: Dict[str, int] = {}
+        job_ids = list(job_ids)
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(job_ids), 500):
+            chunk = job_ids[start:start + 500]
+            rows = self._connect().execute(
+                f"SELECT status, COUNT(*) AS n FROM enrollment_jobs "
+                f"WHERE id IN ({', '.join('?' * len(chunk))}) GROUP BY status",
+                chunk
+            ).fetchall()
+            for row in rows:
+                counts[row["status"]] = counts.get(row["status"], 0) + row["n"]
+        return counts
+
+    def pending_ids(self) -> List[str]:
+        """IDs of queued or processing jobs"""
+        rows = self._connect().execute(
+            "SELECT id FROM enrollment_jobs WHERE status IN ('queued', 'processing')"
+        ).fetchall()
+        return [row["id"] for row in rows]
+
+    def known_users(self) -> set:
+        """Users with a queued, processing or completed job (retrying a failed one is fine)"""
+        rows = self._connect().execute(
+            "SELECT DISTINCT user_id FROM enrollment_jobs WHERE status != 'failed'"
+        ).fetchall()
+        return {row["user_id"] for row in rows}
+
+    # Worker side
+
+    def _claim(self) -> List[EnrollmentJob]:
+        """Claim up to batch_size queued jobs, at most one per user.
+        
+        Only a user's latest registration is processed: older queued jobs are
+        failed as superseded, and a user with a job still processing isn't
+        claimed again until it finishes, so an older job can never overwrite
+        a newer one from a concurrent batch.
+        """
+        db = self._connect()
+        with self._claim_lock:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                superseded = [row["id"] for row in db.execute(
+                    "SELECT id FROM enrollment_jobs AS job WHERE status = 'queued' AND EXISTS ("
+                    "SELECT 1 FROM enrollment_jobs AS newer WHERE newer.user_id = job.user_id "
+                    "AND newer.status IN ('queued', 'processing') AND newer.rowid > job.rowid)"
+                ).fetchall()]
+                if superseded:
+                    db.executemany(
+                        "UPDATE enrollment_jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                        [(SUPERSEDED_ERROR, datetime.now().isoformat(), job_id) for job_id in superseded]
+                    )
+                rows = db.execute(
+                    "SELECT id, user_id, wallet_address, image_paths FROM enrollment_jobs "
+                    "WHERE status = 'queued' AND user_id NOT IN ("
+                    "SELECT user_id FROM enrollment_jobs WHERE status = 'processing') "
+                    "ORDER BY created_at LIMIT ?",
+                    (self.batch_size,)
+                ).fetchall()
+                if rows:
+                    db.executemany(
+                        "UPDATE enrollment_jobs SET status = 'processing', updated_at = ? WHERE id = ?",
+                        [(datetime.now().isoformat(), row["id"]) for row in rows]
+                    )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        for job_id in superseded:
+            shutil.rmtree(os.path.join(self.spool_dir, job_id), ignore_errors=True)
+        return [
+            EnrollmentJob(row["id"], row["user_id"], row["wallet_address"], json.loads(row["image_paths"]))
+            for row in rows
+        ]
+
+    def _finish(self, job: EnrollmentJob, result: Optional[dict], error: Optional[str]):
+        self._connect().execute(
+            "UPDATE enrollment_jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (
+                "failed" if error else "completed",
+                json.dumps(result) if result is not None else None,
+                error,
+                datetime.now().isoformat(),
+                job.id,
+            )
+        )
+        shutil.rmtree(os.path.join(self.spool_dir, job.id), ignore_errors=True)
+
+    def _finish_with_retry(self, job: EnrollmentJob, result: Optional[dict], error: Optional[str]):
+        for attempt in range(1, FINISH_ATTEMPTS + 1):
+            try:
+                self._finish(job, result, error)
+                return
+            except Exception as e:
+                print(f"⚠️ Recording enrollment job {job.id} failed (attempt {attempt}/{FINISH_ATTEMPTS}): {e}")
+                if self._stop.wait(self.poll_interval * attempt):
+                    break
+        # Still 'processing' with its spool intact: requeued on the next start()
+        print(f"❌ Enrollment job {job.id} left in processing")
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                jobs = self._claim()
+            except Exception as e:
+                # e.g. "database is locked"; keep the worker alive and retry
+                print(f"⚠️ Claiming enrollment jobs failed: {e}")
+                self._stop.wait(self.poll_interval)
+                continue
+            if not jobs:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            started = time.time()
+            try:
+                outcomes = self.process_batch(jobs)
+            except Exception as e:
+                outcomes = {job.id: (None, str(e)) for job in jobs}
+
+            for job in jobs:
+                result, error = outcomes.get(job.id, (None, "Job was not processed"))
+                self._finish_with_retry(job, result, error)
+            print(f"📥 Enrolled batch of {len(jobs)} in {time.time() - started:.2f}s")
+
+    def start(self):
+        if self._workers:
+            return
+        # Jobs a crashed worker process was holding go back to the queue
+        self._connect().execute("UPDATE enrollment_jobs SET status = 'queued' WHERE status = 'processing'")
+        self._stop.clear()
+        for i in range(self.worker_count):
+            worker = threading.Thread(target=self._work, name=f"enrollment-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+
+    def wait_until_idle(self, poll_interval: float = 0.5):
+        """Block until nothing is queued or processing (used by bulk imports)"""
+        while True:
+            counts = self.counts()
+            if not counts.get("queued") and not counts.get("processing"):
+                return
+            time.sleep(poll_interval)
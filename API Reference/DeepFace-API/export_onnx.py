@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Export a DeepFace recognition model to ONNX for the onnx inference backend
+
+Usage:
+    pip install -r requirements-onnx.txt
+    python export_onnx.py --model VGG-Face --quantize
+    python export_onnx.py --model Facenet --output models/Facenet.onnx
+"""
+
+import argparse
+import os
+
+from inference_backend import quantized_path
+
+
+def export(model_name: str, output_path: str, opset: int) -> str:
+    import tensorflow as tf
+    import tf2onnx
+    from deepface import DeepFace
+
+    keras_model = DeepFace.build_model(model_name).model
+    input_shape = keras_model.input_shape  # (None, H, W, 3)
+    print(f"🏗️ Exporting {model_name} with input {input_shape}")
+
+    signature = [tf.TensorSpec((None,) + tuple(input_shape[1:]), tf.float32, name="input")]
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tf2onnx.convert.from_keras(keras_model, input_signature=signature, opset=opset, output_path=output_path)
+
+    print(f"✅ Saved {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)")
+    return output_path
+
+
+def quantize(model_path: str) -> str:
+    """Dynamic int8 quantisation of the weights (activations stay float)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_path = quantized_path(model_path)
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    print(f"✅ Saved {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a DeepFace model to ONNX")
+    parser.add_argument("--model", default=os.getenv("DEEPFACE_MODEL", "VGG-Face"))
+    parser.add_argument("--output", default=None, help="Default: models/<model>.onnx")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8 variant")
+    args = parser.parse_args()
+
+    output_path = args.output or os.path.join("models", f"{args.model}.onnx")
+    export(args.model, output_path, args.opset)
+    if args.quantize:
+        quantize(output_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+FacePay Face Index
+Model settings and per-model embedding indexes shared by the API and the
+re-embedding job.
+
+- `app_settings` holds the active model/threshold and the shadow model
+  being back-filled. Cutover rewrites those rows in one upsert.
+- `face_model_embeddings` holds one embedding per (user, model).
+"""
+
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from inference_backend import get_backend
+
+SETTINGS_TTL_SECONDS = 30.0
+INDEX_TTL_SECONDS = 60.0
+PAGE_SIZE = 1000
+
+
+class SettingsSnapshot:
+    """One consistent view of the model settings, for a request or batch"""
+
+    def __init__(self, values: Dict[str, str]):
+        self.active_model = values.get("active_model", "")
+        self.active_threshold = float(values.get("active_threshold", "0"))
+        self.active_model_indexed = values.get("active_model_indexed") == "true"
+        self.shadow_model = values.get("shadow_model") or None
+
+
+class ModelSettings:
+    """Active/shadow model configuration, re-read from `app_settings` every
+    few seconds so a cutover reaches every API replica without a restart"""
+
+    def __init__(self, supabase, default_model: str, default_threshold: float,
+                 ttl_seconds: float = SETTINGS_TTL_SECONDS):
+        self.supabase = supabase
+        self.defaults = {
+            "active_model": default_model,
+            "active_threshold": str(default_threshold),
+            "active_model_indexed": "false",
+            "shadow_model": "",
+        }
+        self.ttl_seconds = ttl_seconds
+        self._values = dict(self.defaults)
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            result = self.supabase.table('app_settings').select('key, value').execute()
+            values = dict(self.defaults)
+            values.update({row['key']: row['value'] for row in result.data or []})
+            self._values = values
+        except Exception as e:
+            print(f"⚠️ Could not read app_settings, keeping previous values: {e}")
+        self._loaded_at = time.time()
+
+    def get(self, key: str) -> str:
+        with self._lock:
+            if time.time() - self._loaded_at > self.ttl_seconds:
+                self._refresh()
+            return self._values.get(key, "")
+
+    def snapshot(self) -> SettingsSnapshot:
+        """All settings from a single refresh. Reading the properties one by
+        one can straddle a cutover and mix the old and new model."""
+        with self._lock:
+            if time.time() - self._loaded_at > self.ttl_seconds:
+                self._refresh()
+            return SettingsSnapshot(self._values)
+
+    @property
+    def active_model(self) -> str:
+        return self.snapshot().active_model
+
+    @property
+    def active_threshold(self) -> float:
+        return self.snapshot().active_threshold
+
+    @property
+    def active_model_indexed(self) -> bool:
+        return self.snapshot().active_model_indexed
+
+    @property
+    def shadow_model(self) -> Optional[str]:
+        return self.snapshot().shadow_model
+
+    def update(self, values: Dict[str, str]):
+        """Write several settings in a single upsert (one statement, so atomic)"""
+        rows = [{"key": key, "value": value} for key, value in values.items()]
+        self.supabase.table('app_settings').upsert(rows).execute()
+        with self._lock:
+            self._loaded_at = 0.0
+
+
+def embed_image_path(image_path: str, model_name: str, detector: str) -> List[float]:
+    """Embedding of the first face in an image file (TensorFlow or ONNX backend)"""
+    return get_backend().represent(image_path, model_name, detector)
+
+
+def embed_image_paths(image_paths: List[str], model_name: str, detector: str) -> List[List[float]]:
+    """Embeddings for several image files, batched where the backend supports it"""
+    return get_backend().represent_batch(image_paths, model_name, detector)
+
+
+def embed_image_bytes(content: bytes, model_name: str, detector: str) -> List[float]:
+    """Embedding of the first face in an encoded image"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
+        temp_file.write(content)
+        temp_path = temp_file.name
+    try:
+        return embed_image_path(temp_path, model_name, detector)
+    finally:
+        os.remove(temp_path)
+
+
+def store_embeddings(supabase, user_ids: List[str], model_name: str, embeddings: List[List[float]]):
+    """Upsert one embedding per user for a model in a single request"""
+    supabase.table('face_model_embeddings').upsert(
+        [{"user_id": user_id, "model_name": model_name, "embedding": embedding}
+         for user_id, embedding in zip(user_ids, embeddings)],
+        on_conflict="user_id,model_name"
+    ).execute()
+
+
+class EmbeddingIndex:
+    """In-memory cosine index over all stored embeddings of one model"""
+
+    def __init__(self, supabase, model_name: str, ttl_seconds: float = INDEX_TTL_SECONDS):
+        self.supabase = supabase
+        self.model_name = model_name
+        self.ttl_seconds = ttl_seconds
+        self.user_ids: List[str] = []
+        self.wallets: Dict[str, str] = {}
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _paged(self, build_query):
+        """All rows of a query, PAGE_SIZE at a time (PostgREST caps one response)"""
+        offset = 0
+        while True:
+            rows = build_query().order('user_id').range(offset, offset + PAGE_SIZE - 1).execute().data or []
+            yield from rows
+            if len(rows) < PAGE_SIZE:
+                return
+            offset += PAGE_SIZE
+
+    def _load(self):
+        user_ids, vectors = [], []
+        for row in self._paged(lambda: self.supabase.table('face_model_embeddings')
+                               .select('user_id, embedding').eq('model_name', self.model_name)):
+            user_ids.append(row['user_id'])
+            vectors.append(row['embedding'])
+
+        wallets = self._paged(lambda: self.supabase.table('face_embeddings').select('user_id, wallet_address'))
+
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        if len(matrix):
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self.user_ids = user_ids
+        self.wallets = {row['user_id']: row['wallet_address'] for row in wallets}
+        self.matrix = matrix
+        self._loaded_at = time.time()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def upsert(self, entries: Dict[str, Tuple[str, List[float]]]):
+        """Add or replace {user_id: (wallet_address, embedding)} just written
+        by this replica, without reloading the gallery. Writes from other
+        replicas arrive with the next TTL reload."""
+        if not entries:
+            return
+        with self._lock:
+            if not self._loaded_at:
+                return  # not loaded yet; the first match loads everything
+            positions = {user_id: i for i, user_id in enumerate(self.user_ids)}
+            vectors = np.asarray([embedding for _, embedding in entries.values()], dtype=np.float32)
+            vectors = vectors.reshape(len(entries), -1)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            if len(self.user_ids) and vectors.shape[1] != self.matrix.shape[1]:
+                self._loaded_at = 0.0  # dimension mismatch; reload from the database
+                return
+
+            new_ids, new_rows = [], []
+            for (user_id, (wallet_address, _)), vector in zip(entries.items(), vectors):
+                self.wallets[user_id] = wallet_address
+                if user_id in positions:
+                    self.matrix[positions[user_id]] = vector
+                else:
+                    new_ids.append(user_id)
+                    new_rows.append(vector)
+            if new_rows:
+                rows = np.stack(new_rows)
+                self.matrix = np.vstack([self.matrix, rows]) if len(self.user_ids) else rows
+                self.user_ids = self.user_ids + new_ids
+
+    def remove(self, user_ids: List[str]):
+        """Drop users (deleted, or re-registered without an embedding for this model)"""
+        with self._lock:
+            if not self._loaded_at:
+                return
+            drop = set(user_ids)
+            keep = [i for i, user_id in enumerate(self.user_ids) if user_id not in drop]
+            if len(keep) == len(self.user_ids):
+                return
+            self.user_ids = [self.user_ids[i] for i in keep]
+            self.matrix = self.matrix[keep]
+            for user_id in drop:
+                self.wallets.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def match(self, embedding: List[float]) -> Optional[Tuple[str, str, float]]:
+        """(user_id, wallet_address, cosine distance) of the nearest user"""
+        with self._lock:
+            if time.time() - self._loaded_at > self.ttl_seconds:
+                self._load()
+            if not self.user_ids:
+                return None
+            probe = np.asarray(embedding, dtype=np.float32)
+            probe /= max(float(np.linalg.norm(probe)), 1e-12)
+            distances = 1.0 - self.matrix @ probe
+            best = int(np.argmin(distances))
+            user_id = self.user_ids[best]
+            return user_id, self.wallets.get(user_id, ""), float(distances[best])
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+FacePay Inference Backends
+Face embedding through TensorFlow/Keras (DeepFace, the default) or through
+ONNX Runtime using a graph exported by export_onnx.py.
+
+Configuration:
+    INFERENCE_BACKEND      tensorflow (default) | onnx
+    ONNX_MODEL_PATH        exported graph, e.g. models/VGG-Face.onnx
+    ONNX_MODEL_NAME        DeepFace model the graph was exported from (default: DEEPFACE_MODEL)
+    ONNX_QUANTIZED         true to load the int8 variant (<name>.int8.onnx)
+    ONNX_INTRA_OP_THREADS  intra-op thread count (default: onnxruntime's choice)
+
+Detection and alignment always go through DeepFace.extract_faces; only the
+embedding network changes, so ONNX embeddings stay comparable with stored
+TensorFlow ones (see test_onnx_parity.py).
+"""
+
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+# Models whose DeepFace client L2-normalises the network output
+L2_NORMALISED_MODELS = {"VGG-Face"}
+
+
+class InferenceBackend:
+    """Turns an image file into a face embedding"""
+
+    name = "base"
+
+    def represent(self, image_path: str, model_name: str, detector: str) -> List[float]:
+        raise NotImplementedError
+
+    def represent_batch(self, image_paths: List[str], model_name: str, detector: str) -> List[List[float]]:
+        return [self.represent(image_path, model_name, detector) for image_path in image_paths]
+
+
+class TensorFlowBackend(InferenceBackend):
+    name = "tensorflow"
+
+    def represent(self, image_path: str, model_name: str, detector: str) -> List[float]:
+        from deepface import DeepFace
+
+        result = DeepFace.represent(
+            img_path=image_path,
+            model_name=model_name,
+            detector_backend=detector,
+            enforce_detection=False
+        )
+        return result[0]['embedding']
+
+
+def quantized_path(model_path: str) -> str:
+    root, extension = os.path.splitext(model_path)
+    return f"{root}.int8{extension}"
+
+
+def resize_with_padding(face: np.ndarray, target_size: tuple) -> np.ndarray:
+    """Same letterboxing as deepface.commons.preprocessing.resize_image"""
+    import cv2
+
+    factor = min(target_size[0] / face.shape[0], target_size[1] / face.shape[1])
+    face = cv2.resize(face, (int(face.shape[1] * factor), int(face.shape[0] * factor)))
+
+    diff_0 = target_size[0] - face.shape[0]
+    diff_1 = target_size[1] - face.shape[1]
+    face = np.pad(
+        face,
+        ((diff_0 // 2, diff_0 - diff_0 // 2), (diff_1 // 2, diff_1 - diff_1 // 2), (0, 0)),
+        "constant"
+    )
+    if face.shape[0:2] != target_size:
+        face = cv2.resize(face, (target_size[1], target_size[0]))
+
+    face = face.astype(np.float32)
+    if face.max() > 1:
+        face /= 255.0
+    return face
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime session for one exported DeepFace model.
+
+    Requests for any other model fall through to TensorFlow so a model
+    upgrade (reembed_job.py) keeps working before a new graph is exported.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, model_name: str, intra_op_threads: int = 0, quantized: bool = False):
+        import onnxruntime as ort
+
+        if quantized:
+            model_path = quantized_path(model_path)
+        self.model_path = model_path
+        self.model_name = model_name
+        self.quantized = quantized
+        self.fallback = TensorFlowBackend()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # NHWC, e.g. [None, 224, 224, 3]
+        self.target_size = (int(model_input.shape[1]), int(model_input.shape[2]))
+        print(f"⚡ ONNX backend: {model_name} from {model_path} (input {self.target_size})")
+
+    def preprocess(self, image_path: str, detector: str) -> np.ndarray:
+        from deepface import DeepFace
+
+        face_objs = DeepFace.extract_faces(
+            img_path=image_path,
+            detector_backend=detector,
+            enforce_detection=False,
+            align=True
+        )
+        # extract_faces returns RGB in [0, 1]; DeepFace's models expect BGR
+        face = face_objs[0]["face"][:, :, ::-1]
+        return resize_with_padding(face, self.target_size)[np.newaxis, ...]
+
+    def embed_batch(self, faces: np.ndarray) -> np.ndarray:
+        """Embeddings for a preprocessed NHWC batch"""
+        embeddings = self.session.run(None, {self.input_name: faces.astype(np.float32)})[0]
+        if self.model_name in L2_NORMALISED_MODELS:
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+
+    def represent(self, image_path: str, model_name: str, detector: str) -> List[float]:
+        if model_name != self.model_name:
+            return self.fallback.represent(image_path, model_name, detector)
+        return self.embed_batch(self.preprocess(image_path, detector))[0].tolist()
+
+    def represent_batch(self, image_paths: List[str], model_name: str, detector: str) -> List[List[float]]:
+        """One session run for the whole batch instead of one per image"""
+        if model_name != self.model_name or not image_paths:
+            return self.fallback.represent_batch(image_paths, model_name, detector)
+        faces = np.concatenate([self.preprocess(image_path, detector) for image_path in image_paths])
+        return self.embed_batch(faces).tolist()
+
+
+_backend: Optional[InferenceBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> InferenceBackend:
+    """Process-wide backend selected by INFERENCE_BACKEND"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend_name = os.getenv("INFERENCE_BACKEND", "tensorflow").lower()
+            if backend_name == "onnx":
+                _backend = OnnxBackend(
+                    model_path=os.getenv("ONNX_MODEL_PATH", "models/VGG-Face.onnx"),
+                    model_name=os.getenv("ONNX_MODEL_NAME", os.getenv("DEEPFACE_MODEL", "VGG-Face")),
+                    intra_op_threads=int(os.getenv("ONNX_INTRA_OP_THREADS", "0")),
+                    quantized=os.getenv("ONNX_QUANTIZED", "false").lower() == "true",
+                )
+            else:
+                _backend = TensorFlowBackend()
+        return _backend
@@ -0,0 +1,694 @@
+#!/usr/bin/env python3
+"""
+FacePay Load Test
+Replays a traffic mix of registrations, recognitions, deletes and payments
+against the DeepFace API at a target rate and reports latency percentiles,
+error rates and the server's memory, descriptor, thread and temp-file
+growth. Supabase and the chain are replaced by the in-memory stand-ins
+in local_standins.py, so runs can be long and repeatable.
+
+Usage:
+    python load_test.py --rate 1 --duration 300                     # one step
+    python load_test.py --rates 0.5,1,2,4 --step-duration 120       # capacity per replica
+    python load_test.py --rate 1 --duration 3600 --baseline base.json   # soak + regression check
+    python load_test.py --rate 2 --duration 600 --record traffic.jsonl
+    python load_test.py --replay traffic.jsonl
+    python load_test.py --rate 2 --duration 300 --settlement batched   # PaymentHub.chargeBatch
+
+By default the API is started as a subprocess with LOCAL_STANDINS=true and
+its own TMPDIR, so temp-file leaks show up as files left behind. Use --url
+(and --pid for resource tracking) to target a server started separately.
+Exits non-zero when a leak or a regression against --baseline is found.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+from eth_account import Account
+from requests.adapters import HTTPAdapter
+
+from chain_cache import ChainReader, FeeOracle
+from local_standins import InMemoryChain
+from payment_executor import PaymentExecutor
+from payment_orchestrator import PaymentOrchestrator
+from settlement_batcher import SettlementBatcher
+
+OPERATIONS = ("register", "recognize", "delete", "payment")
+DEFAULT_MIX = "recognize=60,payment=20,register=15,delete=5"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+# Upper bound on one registration, from upload until its job finishes
+REGISTER_TIMEOUT_SECONDS = 120
+# The only enrollment job error caused by the request (main.process_enrollment_batch);
+# any other failure is the server's and counts towards the error rate
+NO_FACE_ERROR = "No faces detected in any image"
+
+PERCENTILES = (50, 90, 95, 99)
+# Leak thresholds, measured after the run has drained and settled
+FD_LEAK_THRESHOLD = 10
+THREAD_LEAK_THRESHOLD = 5
+RSS_SLOPE_LEAK_MB_PER_HOUR = 100.0
+# Growth rates over shorter windows are mostly noise (GC, allocator, caches)
+MIN_SLOPE_WINDOW_SECONDS = 600
+
+
+# Traffic
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        op, weight = part.split("=")
+        if op.strip() not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{op}' (expected one of {', '.join(OPERATIONS)})")
+        weights[op.strip()] = float(weight)
+    return weights
+
+
+def synthetic_schedule(rate: float, duration: float, mix: Dict[str, float], images: List[str],
+                       rng: random.Random) -> List[dict]:
+    """Poisson arrivals at `rate` requests/s with operations drawn from `mix`"""
+    ops, weights = list(mix), list(mix.values())
+    events, t = [], rng.expovariate(rate)
+    while t < duration:
+        events.append({
+            "t": round(t, 4),
+            "op": rng.choices(ops, weights)[0],
+            "image": os.path.basename(rng.choice(images)),
+            "amount": round(rng.uniform(0.5, 5.0), 2),
+        })
+        t += rng.expovariate(rate)
+    return events
+
+
+def load_schedule(path: str) -> List[dict]:
+    with open(path) as schedule_file:
+        events = [json.loads(line) for line in schedule_file if line.strip()]
+    return sorted(events, key=lambda event: event["t"])
+
+
+def save_schedule(path: str, steps: List[Tuple[float, List[dict]]], step_duration: float):
+    """Write all steps back to back as one replayable schedule"""
+    with open(path, "w") as schedule_file:
+        for i, (_, events) in enumerate(steps):
+            for event in events:
+                schedule_file.write(json.dumps(dict(event, t=round(event["t"] + i * step_duration, 4))) + "\n")
+
+
+# Server under test
+
+class ServerProcess:
+    """The API as a uvicorn subprocess on the stand-ins, with its own TMPDIR"""
+
+    def __init__(self, run_dir: str, port: int, indexed: bool, db_latency_ms: float):
+        self.run_dir = run_dir
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.temp_dir = os.path.join(run_dir, "tmp")
+        self.spool_dir = os.path.join(run_dir, "spool")
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+        seed_path = os.path.join(run_dir, "seed.json")
+        with open(seed_path, "w") as seed_file:
+            json.dump({"app_settings": [
+                {"key": "active_model_indexed", "value": "true" if indexed else "false"}
+            ]}, seed_file)
+
+        self.env = dict(
+            os.environ,
+            LOCAL_STANDINS="true",
+            LOCAL_STANDINS_SEED=seed_path,
+            LOCAL_STANDINS_DB_LATENCY_MS=str(db_latency_ms),
+            TMPDIR=self.temp_dir,
+            ENROLLMENT_DB_PATH=os.path.join(run_dir, "enrollment_jobs.db"),
+            ENROLLMENT_SPOOL_DIR=self.spool_dir,
+        )
+        self.process: Optional[subprocess.Popen] = None
+        self.log_file = None
+
+    def start(self, timeout: float = 180.0):
+        self.log_file = open(os.path.join(self.run_dir, "server.log"), "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=self.env,
+            stdout=self.log_file,
+            stderr=subprocess.STDOUT,
+        )
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"API exited with code {self.process.returncode}, see {self.log_file.name}")
+            try:
+                if requests.get(f"{self.url}/ping", timeout=2).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(1)
+        raise RuntimeError(f"API did not answer /ping within {timeout:.0f}s")
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.log_file:
+            self.log_file.close()
+
+
+def count_files(directory: Optional[str]) -> int:
+    if not directory or not os.path.isdir(directory):
+        return 0
+    return sum(len(files) for _, _, files in os.walk(directory))
+
+
+class ResourceSampler:
+    """Samples RSS, open descriptors, threads and temp files of a process
+    from /proc (Linux) at a fixed interval"""
+
+    def __init__(self, pid: int, temp_dir: Optional[str] = None, spool_dir: Optional[str] = None,
+                 interval: float = 5.0):
+        self.pid = pid
+        self.temp_dir = temp_dir
+        self.spool_dir = spool_dir
+        self.interval = interval
+        self.samples: List[dict] = []
+        self._started = time.time()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+
+    @staticmethod
+    def available(pid: Optional[int]) -> bool:
+        return pid is not None and os.path.isdir(f"/proc/{pid}")
+
+    def sample(self) -> dict:
+        status = {}
+        with open(f"/proc/{self.pid}/status") as status_file:
+            for line in status_file:
+                key, _, value = line.partition(":")
+                status[key] = value.strip()
+        sample = {
+            "t": round(time.time() - self._started, 2),
+            "rss_mb": int(status["VmRSS"].split()[0]) / 1024,
+            "threads": int(status["Threads"]),
+            "fds": len(os.listdir(f"/proc/{self.pid}/fd")),
+            "temp_files": count_files(self.temp_dir),
+            "spool_files": count_files(self.spool_dir),
+        }
+        self.samples.append(sample)
+        return sample
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except (OSError, KeyError):
+                return  # process exited
+
+    def start(self):
+        self.sample()
+        self._thread.start()
+
+    def stop(self) -> dict:
+        self._stop.set()
+        self._thread.join(timeout=self.interval * 2)
+        return self.sample()
+
+    def summary(self) -> dict:
+        summary = {}
+        for metric in ("rss_mb", "fds", "threads", "temp_files", "spool_files"):
+            values = [sample[metric] for sample in self.samples]
+            summary[metric] = {"start": values[0], "end": values[-1], "max": max(values)}
+
+        # Growth rate over the second half of the run, past warm-up (model
+        # loading, first index build) so it reflects steady-state leaks
+        steady = self.samples[len(self.samples) // 2:]
+        if len(steady) >= 3 and steady[-1]["t"] - steady[0]["t"] >= MIN_SLOPE_WINDOW_SECONDS:
+            t = np.array([sample["t"] for sample in steady]) / 3600
+            for metric in ("rss_mb", "fds", "threads"):
+                slope = np.polyfit(t, [sample[metric] for sample in steady], 1)[0]
+                summary[metric]["slope_per_hour"] = round(float(slope), 2)
+        return summary
+
+
+def find_leaks(resources: dict) -> List[str]:
+    leaks = []
+    if resources["temp_files"]["end"] > resources["temp_files"]["start"]:
+        leaks.append(f"{resources['temp_files']['end'] - resources['temp_files']['start']} temp files left behind")
+    if resources["spool_files"]["end"] > 0:
+        leaks.append(f"{resources['spool_files']['end']} enrollment spool files left after the queue drained")
+    if resources["fds"]["end"] - resources["fds"]["start"] > FD_LEAK_THRESHOLD:
+        leaks.append(f"open descriptors grew {resources['fds']['start']} -> {resources['fds']['end']}")
+    if resources["threads"]["end"] - resources["threads"]["start"] > THREAD_LEAK_THRESHOLD:
+        leaks.append(f"threads grew {resources['threads']['start']} -> {resources['threads']['end']}")
+    if resources["rss_mb"].get("slope_per_hour", 0) > RSS_SLOPE_LEAK_MB_PER_HOUR:
+        leaks.append(f"RSS still growing {resources['rss_mb']['slope_per_hour']:.0f} MB/h at the end of the run")
+    return leaks
+
+
+# Load generation
+
+class OpStats:
+    """Latency samples and outcomes per operation for one load step"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.outcomes: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, op: str, outcome: str, latency_ms: Optional[float] = None):
+        with self._lock:
+            counts = self.outcomes.setdefault(op, {"ok": 0, "rejected": 0, "error": 0, "skipped": 0})
+            counts[outcome] += 1
+            if latency_ms is not None and outcome != "skipped":
+                self.latencies.setdefault(op, []).append(latency_ms)
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for op, counts in self.outcomes.items():
+            attempted = counts["ok"] + counts["rejected"] + counts["error"]
+            entry = dict(counts, count=attempted, error_rate=counts["error"] / attempted if attempted else 0.0)
+            latencies = self.latencies.get(op)
+            if latencies:
+                values = np.percentile(latencies, PERCENTILES)
+                entry.update({f"p{p}_ms": round(float(v), 1) for p, v in zip(PERCENTILES, values)})
+                entry["max_ms"] = round(max(latencies), 1)
+            result[op] = entry
+        return result
+
+
+class LoadRunner:
+    """Issues scheduled operations against the API and records outcomes.
+
+    Requests are sent open-loop: each one is due at its scheduled time and
+    latency is measured from then, so time spent waiting for a free client
+    slot counts against the server instead of hiding a backlog.
+    """
+
+    def __init__(self, api_url: str, images: Dict[str, str], payers: int, max_in_flight: int,
+                 block_time: float, rpc_latency: float, unique_uploads: bool, run_id: str, seed: int = 1,
+                 batch_window: Optional[float] = None):
+        self.api_url = api_url
+        self.images = images
+        self.max_in_flight = max_in_flight
+        self.unique_uploads = unique_uploads
+        self.run_id = run_id
+        self.rng = random.Random(seed)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_in_flight, pool_maxsize=max_in_flight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Every synthetic user gets one of a few funded wallets, so any
+        # recognised user can pay and per-wallet nonce pipelining is exercised
+        self.chain = InMemoryChain(block_time=block_time, rpc_latency=rpc_latency)
+        accounts = [Account.create() for _ in range(payers + 1)]
+        self.merchant = {"address": accounts[0].address, "private_key": accounts[0].key.hex()}
+        self.wallets = {
+            f"payer{i}": {"address": account.address, "private_key": account.key.hex()}
+            for i, account in enumerate(accounts[1:])
+        }
+        hub = self.chain.payment_hub()
+        for wallet in self.wallets.values():
+            self.chain.mint(wallet["address"], 10 ** 15)
+            self.chain.approve(wallet["address"], hub.address, 10 ** 15)
+
+        self.chain_reader = ChainReader(self.chain, self.chain.token)
+        self.fees = FeeOracle(self.chain, refresh_seconds=max(block_time, 1.0))
+        self.executor = PaymentExecutor(
+            self.chain, self.chain.token, self.chain.chain_id,
+            fee_params=self.fees.params,
+            poll_interval=min(block_time / 2, 0.5),
+            max_in_flight=max_in_flight,
+        )
+        self.chain_reader.attach(self.executor)
+        # With a batch window, payments settle through PaymentHub.chargeBatch
+        # sent by the merchant instead of one transfer per payment
+        self.settlement = None
+        if batch_window is not None:
+            self.settlement = SettlementBatcher(
+                self.executor, hub, self.merchant,
+                max_batch_size=max(max_in_flight, 1), window_seconds=batch_window
+            )
+        self.orchestrator = PaymentOrchestrator(
+            api_url, self.wallets, self.merchant["address"], self.chain_reader, self.executor,
+            spender_address=hub.address if self.settlement else None,
+            http_timeout=120,
+            settlement=self.settlement
+        )
+
+        self.seed_users: List[str] = []
+        self.load_users: List[str] = []
+        self._users_lock = threading.Lock()
+        self._counter = 0
+        self.stats = OpStats()
+
+    def _next_user_id(self) -> str:
+        with self._users_lock:
+            self._counter += 1
+            return f"load-{self.run_id}-{self._counter}"
+
+    def _wallet_for(self, user_id: str) -> str:
+        wallets = list(self.wallets.values())
+        return wallets[zlib.crc32(user_id.encode()) % len(wallets)]["address"]
+
+    def _upload(self, image_name: str) -> bytes:
+        with open(self.images[image_name], "rb") as image_file:
+            content = image_file.read()
+        if self.unique_uploads:
+            # Decoders stop at the JPEG/PNG end marker, so trailing bytes
+            # keep the image intact while defeating request coalescing
+            content += os.urandom(16)
+        return content
+
+    # Operations (run in worker threads); each returns the outcome
+
+    def register(self, event: dict, user_id: Optional[str] = None) -> str:
+        user_id = user_id or self._next_user_id()
+        response = self.session.post(
+            f"{self.api_url}/register-face",
+            data={"userId": user_id, "walletAddress": self._wallet_for(user_id)},
+            files=[("images", (event["image"], self._upload(event["image"]), "image/jpeg"))],
+            timeout=60,
+        )
+        if response.status_code != 202:
+            return "rejected" if response.status_code < 500 else "error"
+
+        # Registration is asynchronous; time it until the job finishes
+        status_url = f"{self.api_url}{response.json()['statusUrl']}"
+        deadline = time.time() + REGISTER_TIMEOUT_SECONDS
+        while True:
+            if time.time() > deadline:
+                print(f"❌ Registration of {user_id} still pending after {REGISTER_TIMEOUT_SECONDS}s")
+                return "error"
+            job = self.session.get(status_url, timeout=30).json()
+            if job["status"] == "completed":
+                with self._users_lock:
+                    self.load_users.append(user_id)
+                return "ok"
+            if job["status"] == "failed":
+                return "rejected" if job.get("error") == NO_FACE_ERROR else "error"
+            time.sleep(0.25)
+
+    def recognize(self, event: dict) -> str:
+        response = self.session.post(
+            f"{self.api_url}/recognize-face",
+            files={"image": (event["image"], self._upload(event["image"]), "image/jpeg")},
+            timeout=120,
+        )
+        if response.status_code == 200:
+            return "ok"
+        return "rejected" if response.status_code in (400, 404) else "error"
+
+    def delete(self, event: dict) -> str:
+        with self._users_lock:
+            if not self.load_users:
+                return "skipped"
+            user_id = self.load_users.pop(self.rng.randrange(len(self.load_users)))
+        response = self.session.delete(f"{self.api_url}/user/{user_id}", timeout=30)
+        return "ok" if response.status_code == 200 else "error"
+
+    async def payment(self, event: dict) -> str:
+        result = await self.orchestrator.checkout(self.images[event["image"]], event["amount"])
+        if result["success"]:
+            return "ok"
+        return "rejected" if result["error"] == "Face not recognized" else "error"
+
+    # Driving
+
+    def seed(self, count: int):
+        """Register users for every image before the timed run (also warms
+        up the model) and keep them for the whole run"""
+        names = sorted(self.images)
+        for i in range(count):
+            user_id = f"seed-{self.run_id}-{i}"
+            outcome = self.register({"image": names[i % len(names)]}, user_id)
+            if outcome != "ok":
+                raise RuntimeError(f"Seeding {user_id} failed ({outcome})")
+            self.seed_users.append(user_id)
+        with self._users_lock:
+            self.load_users = [u for u in self.load_users if u not in self.seed_users]
+        for name in names:
+            self.recognize({"image": name})
+
+    async def _run_event(self, event: dict, due: float, slots: asyncio.Semaphore):
+        async with slots:
+            op = event["op"]
+            try:
+                if op == "payment":
+                    outcome = await self.payment(event)
+                else:
+                    outcome = await asyncio.to_thread(getattr(self, op), event)
+            except Exception as e:
+                print(f"❌ {op} failed: {e}")
+                outcome = "error"
+            self.stats.record(op, outcome, (time.perf_counter() - due) * 1000)
+
+    async def run_step(self, target_rate: float, events: List[dict]) -> dict:
+        """Play one schedule and return its per-operation summary"""
+        self.stats = OpStats()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = []
+        started = time.perf_counter()
+        for event in events:
+            due = started + event["t"]
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(self._run_event(event, due, slots)))
+        await asyncio.gather(*tasks)
+        await self.orchestrator.drain()
+        elapsed = time.perf_counter() - started
+
+        step = {
+            "target_rate": target_rate,
+            "achieved_rate": round(len(events) / elapsed, 3) if elapsed else 0.0,
+            "requests": len(events),
+            "seconds": round(elapsed, 1),
+            "ops": self.stats.summary(),
+        }
+        if self.settlement:
+            # Cumulative over the run so far
+            step["settlement"] = self.settlement.stats()
+        return step
+
+    def shutdown(self):
+        if self.settlement:
+            self.settlement.close()
+        self.executor.shutdown(wait=True)
+        self.fees.stop()
+        self.chain.stop()
+
+
+# Reporting
+
+def step_within_slo(step: dict, slo_ms: float, max_error_rate: float) -> bool:
+    # The API is saturated once it can no longer keep up with the offered rate
+    if step["achieved_rate"] < 0.9 * step["target_rate"]:
+        return False
+    for op, entry in step["ops"].items():
+        if entry["error_rate"] > max_error_rate:
+            return False
+        if op != "register" and entry.get("p95_ms", 0) > slo_ms:
+            return False
+    return True
+
+
+def find_regressions(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Latency or error-rate regressions of steps run at the same rate"""
+    regressions = []
+    baseline_steps = {step["target_rate"]: step for step in baseline.get("steps", [])}
+    for step in report["steps"]:
+        base = baseline_steps.get(step["target_rate"])
+        if not base:
+            continue
+        for op, entry in step["ops"].items():
+            base_entry = base["ops"].get(op)
+            if not base_entry:
+                continue
+            for metric in ("p50_ms", "p95_ms"):
+                if metric in entry and metric in base_entry and entry[metric] > base_entry[metric] * (1 + tolerance):
+                    regressions.append(
+                        f"{op} {metric} at {step['target_rate']}/s: {base_entry[metric]:.0f} -> {entry[metric]:.0f}"
+                    )
+            if entry["error_rate"] > base_entry["error_rate"] + 0.01:
+                regressions.append(
+                    f"{op} error rate at {step['target_rate']}/s: "
+                    f"{base_entry['error_rate']:.1%} -> {entry['error_rate']:.1%}"
+                )
+    return regressions
+
+
+def print_step(step: dict):
+    print(f"\n📊 {step['requests']} requests in {step['seconds']}s "
+          f"(target {step['target_rate']}/s, achieved {step['achieved_rate']}/s)")
+    print(f"   {'op':<10} {'count':>6} {'ok':>6} {'rej':>5} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for op, entry in sorted(step["ops"].items()):
+        print(f"   {op:<10} {entry['count']:>6} {entry['ok']:>6} {entry['rejected']:>5} {entry['error']:>5} "
+              f"{entry.get('p50_ms', 0):>7.0f}ms {entry.get('p95_ms', 0):>7.0f}ms {entry.get('p99_ms', 0):>7.0f}ms")
+    if "settlement" in step:
+        settlement = step["settlement"]
+        print(f"   📦 {settlement['payments']} payments in {settlement['batches']} batches, "
+              f"{settlement['gas_per_payment']:.0f} gas/payment, "
+              f"{settlement['avg_queue_wait_seconds']:.2f}s avg queue wait, "
+              f"{settlement['latency_saved_seconds']:+.1f}s settlement time saved")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load and soak test the face + payment flow")
+    parser.add_argument("--rate", type=float, default=1.0, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=300, help="Seconds of traffic (single step)")
+    parser.add_argument("--rates", default=None, help="Comma-separated rates to step through (capacity search)")
+    parser.add_argument("--step-duration", type=float, default=120, help="Seconds per step with --rates")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--replay", default=None, help="JSONL schedule to replay instead of synthetic traffic")
+    parser.add_argument("--record", default=None, help="Write the generated schedule to this JSONL file")
+    parser.add_argument("--images", default="../Pictures", help="Directory of face images")
+    parser.add_argument("--seed-users", type=int, default=4, help="Users registered before the timed run")
+    parser.add_argument("--payers", type=int, default=8, help="Funded wallets shared by synthetic users")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Client-side concurrency cap")
+    parser.add_argument("--indexed", action="store_true", help="Recognise via the embedding index")
+    parser.add_argument("--allow-coalescing", action="store_true", help="Send byte-identical uploads")
+    parser.add_argument("--block-time", type=float, default=1.0, help="Stand-in chain block time (s)")
+    parser.add_argument("--settlement", choices=("single", "batched"), default="single",
+                        help="One transfer per payment, or PaymentHub.chargeBatch per window")
+    parser.add_argument("--batch-window", type=float, default=2.0, help="Seconds per batch with --settlement batched")
+    parser.add_argument("--rpc-latency-ms", type=float, default=0, help="Simulated chain RPC round trip")
+    parser.add_argument("--db-latency-ms", type=float, default=0, help="Simulated Supabase round trip")
+    parser.add_argument("--url", default=None, help="Use an already running API instead of starting one")
+    parser.add_argument("--pid", type=int, default=None, help="PID of the --url server for resource tracking")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="Resource sampling interval (s)")
+    parser.add_argument("--settle", type=float, default=10.0, help="Idle seconds before the final resource sample")
+    parser.add_argument("--slo-ms", type=float, default=5000, help="p95 latency objective for capacity")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--baseline", default=None, help="Previous report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed latency increase vs baseline")
+    parser.add_argument("--output", default="load_report.json")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    images = {
+        name: os.path.join(args.images, name) for name in sorted(os.listdir(args.images))
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    }
+    if not images:
+        print(f"❌ No images found in {args.images}")
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    if args.replay:
+        events = load_schedule(args.replay)
+        span = events[-1]["t"] if events else 0.0
+        steps = [(round(len(events) / span, 3) if span else 0.0, events)]
+    else:
+        mix = parse_mix(args.mix)
+        rates = [float(r) for r in args.rates.split(",")] if args.rates else [args.rate]
+        duration = args.step_duration if args.rates else args.duration
+        steps = [(rate, synthetic_schedule(rate, duration, mix, list(images.values()), rng)) for rate in rates]
+        if args.record:
+            save_schedule(args.record, steps, duration)
+
+    print("🎭 FacePay Load Test")
+    print("=" * 50)
+
+    run_dir = tempfile.mkdtemp(prefix="facepay-load-")
+    server, sampler, runner = None, None, None
+    report = {"config": vars(args), "steps": []}
+    try:
+        if args.url:
+            api_url, pid, temp_dir, spool_dir = args.url.rstrip("/"), args.pid, None, None
+        else:
+            server = ServerProcess(run_dir, args.port, args.indexed, args.db_latency_ms)
+            print(f"🚀 Starting API on stand-ins ({run_dir})")
+            server.start()
+            api_url, pid, temp_dir, spool_dir = server.url, server.pid, server.temp_dir, server.spool_dir
+
+        runner = LoadRunner(
+            api_url, images, args.payers, args.max_in_flight, args.block_time,
+            args.rpc_latency_ms / 1000, not args.allow_coalescing, run_id=str(int(time.time())), seed=args.seed,
+            batch_window=args.batch_window if args.settlement == "batched" else None
+        )
+        print(f"👥 Seeding {args.seed_users} users")
+        runner.seed(args.seed_users)
+
+        if ResourceSampler.available(pid):
+            sampler = ResourceSampler(pid, temp_dir, spool_dir, args.sample_interval)
+            sampler.start()
+        else:
+            print("⚠️ No local server PID; memory/descriptor/temp-file tracking disabled")
+
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=args.max_in_flight + 8))
+        for rate, events in steps:
+            step = loop.run_until_complete(runner.run_step(rate, events))
+            print_step(step)
+            report["steps"].append(step)
+        loop.close()
+
+        if sampler:
+            time.sleep(args.settle)
+            sampler.stop()
+            report["resources"] = sampler.summary()
+            report["resources"]["samples"] = sampler.samples
+            report["leaks"] = find_leaks(report["resources"])
+    finally:
+        if runner:
+            runner.shutdown()
+        if server:
+            server.stop()
+
+    passing = [s["target_rate"] for s in report["steps"] if step_within_slo(s, args.slo_ms, args.max_error_rate)]
+    report["capacity"] = {
+        "max_rate_within_slo": max(passing) if passing else None,
+        "slo_ms": args.slo_ms,
+        "max_error_rate": args.max_error_rate,
+    }
+    report["regressions"] = []
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            report["regressions"] = find_regressions(report, json.load(baseline_file), args.tolerance)
+
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+
+    print(f"\n🏁 Capacity per replica: {report['capacity']['max_rate_within_slo'] or 'below the lowest rate'} req/s "
+          f"(p95 <= {args.slo_ms:.0f} ms, errors <= {args.max_error_rate:.0%})")
+    if "resources" in report:
+        rss = report["resources"]["rss_mb"]
+        print(f"   Memory: {rss['start']:.0f} -> {rss['end']:.0f} MB (max {rss['max']:.0f} MB, "
+              f"{rss.get('slope_per_hour', 0):+.0f} MB/h)")
+    for leak in report.get("leaks", []):
+        print(f"❌ Leak: {leak}")
+    for regression in report["regressions"]:
+        print(f"❌ Regression: {regression}")
+    print(f"📄 Report saved to {args.output}")
+
+    if not server or not report.get("leaks"):
+        shutil.rmtree(run_dir, ignore_errors=True)
+    else:
+        print(f"   Server log and leftover files kept in {run_dir}")
+    sys.exit(1 if report.get("leaks") or report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
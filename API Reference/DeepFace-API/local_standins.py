@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+FacePay Local Stand-ins
+In-memory replacements for Supabase and the chain so the face + payment
+flow can be load tested without touching the real project or Sepolia.
+
+InMemorySupabase implements the subset of the supabase-py query builder
+used by this service (select/insert/upsert/update/delete with eq, neq, gt,
+gte, lt, lte, in_, order, limit, range and count="exact"), including the
+unique keys and the ON DELETE CASCADE from database_schema.sql.
+
+InMemoryChain is a Web3 stand-in with a single ERC-20 token. It accepts
+real signed transactions, so PaymentExecutor, ChainReader and FeeOracle
+run unchanged against it, and mines them in nonce order every block.
+
+The API uses the Supabase stand-in when started with LOCAL_STANDINS=true:
+    LOCAL_STANDINS_SEED           JSON file of {table: [rows]} loaded at startup
+    LOCAL_STANDINS_DB_LATENCY_MS  simulated round trip per query (default 0)
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Tables whose primary key is not a generated `id`
+PRIMARY_KEYS = {"app_settings": "key"}
+
+UNIQUE_KEYS = {
+    "face_embeddings": [("user_id",)],
+    "face_model_embeddings": [("user_id", "model_name")],
+}
+
+# parent table -> [(child table, column)] deleted along with the parent row
+CASCADES = {"face_embeddings": [("face_model_embeddings", "user_id")]}
+
+
+class StandinResponse:
+    """Mirrors the `.data` / `.count` of a supabase-py APIResponse"""
+
+    def __init__(self, data: List[dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class StandinError(Exception):
+    """Raised where PostgREST would return an error (e.g. unique violation)"""
+
+
+class _Query:
+    def __init__(self, db: "InMemorySupabase", table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns: Optional[List[str]] = None
+        self.count: Optional[str] = None
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.filters: List[Callable[[dict], bool]] = []
+        self.order_by: Optional[Tuple[str, bool]] = None
+        self.row_limit: Optional[int] = None
+        self.offset = 0
+
+    # Actions
+
+    def select(self, columns: str = "*", count: Optional[str] = None):
+        self.action = "select"
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        self.count = count
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None):
+        self.action, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values: dict):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # Filters and modifiers
+
+    def _filter(self, predicate: Callable[[dict], bool]):
+        self.filters.append(predicate)
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter(lambda row: row.get(column) == value)
+
+    def neq(self, column: str, value):
+        return self._filter(lambda row: row.get(column) != value)
+
+    def gt(self, column: str, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] > value)
+
+    def gte(self, column: str, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] >= value)
+
+    def lt(self, column: str, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] < value)
+
+    def lte(self, column: str, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] <= value)
+
+    def in_(self, column: str, values):
+        values = set(values)
+        return self._filter(lambda row: row.get(column) in values)
+
+    def order(self, column: str, desc: bool = False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, size: int):
+        self.row_limit = size
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset, self.row_limit = start, end - start + 1
+        return self
+
+    def execute(self) -> StandinResponse:
+        return self.db._execute(self)
+
+
+class InMemorySupabase:
+    """Drop-in for the supabase-py `Client` backed by Python dicts"""
+
+    def __init__(self, seed: Optional[Dict[str, List[dict]]] = None, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[dict]] = {}
+        self._lock = threading.Lock()
+        for table, rows in (seed or {}).items():
+            self.table(table).upsert(rows).execute()
+
+    @classmethod
+    def from_env(cls) -> "InMemorySupabase":
+        seed = None
+        seed_path = os.getenv("LOCAL_STANDINS_SEED")
+        if seed_path:
+            with open(seed_path) as seed_file:
+                seed = json.load(seed_file)
+        latency = float(os.getenv("LOCAL_STANDINS_DB_LATENCY_MS", "0")) / 1000
+        print(f"🧪 Using in-memory Supabase stand-in (latency {latency * 1000:.0f} ms)")
+        return cls(seed, latency)
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    # Execution
+
+    def _execute(self, query: _Query) -> StandinResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            rows = self.tables.setdefault(query.table, [])
+            if query.action == "select":
+                response = self._select(rows, query)
+            elif query.action in ("insert", "upsert"):
+                response = StandinResponse(self._write(query))
+            elif query.action == "update":
+                matched = [row for row in rows if all(f(row) for f in query.filters)]
+                for row in matched:
+                    row.update(query.payload)
+                    row["updated_at"] = datetime.now().isoformat()
+                response = StandinResponse(matched)
+            else:
+                matched = [row for row in rows if all(f(row) for f in query.filters)]
+                deleted = {id(row) for row in matched}
+                self.tables[query.table] = [row for row in rows if id(row) not in deleted]
+                self._cascade(query.table, matched)
+                response = StandinResponse(matched)
+        # Round-trip through JSON like the HTTP API, so callers never share rows
+        response.data = json.loads(json.dumps(response.data))
+        return response
+
+    def _select(self, rows: List[dict], query: _Query) -> StandinResponse:
+        matched = [row for row in rows if all(f(row) for f in query.filters)]
+        if query.order_by:
+            column, desc = query.order_by
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        count = len(matched) if query.count else None
+        end = None if query.row_limit is None else query.offset + query.row_limit
+        matched = matched[query.offset:end]
+        if query.columns is not None:
+            matched = [{column: row.get(column) for column in query.columns} for row in matched]
+        return StandinResponse(matched, count)
+
+    def _write(self, query: _Query) -> List[dict]:
+        rows = self.tables[query.table]
+        payload = query.payload if isinstance(query.payload, list) else [query.payload]
+        primary_key = PRIMARY_KEYS.get(query.table, "id")
+        if query.on_conflict:
+            conflict_keys = [tuple(c.strip() for c in query.on_conflict.split(","))]
+        else:
+            conflict_keys = [(primary_key,)]
+        unique_keys = conflict_keys + [k for k in UNIQUE_KEYS.get(query.table, []) if k not in conflict_keys]
+
+        written = []
+        for values in payload:
+            existing = None
+            for key in unique_keys:
+                if all(column in values for column in key):
+                    existing = next((row for row in rows if all(row.get(c) == values[c] for c in key)), None)
+                    if existing is not None:
+                        break
+
+            if existing is not None:
+                if query.action == "insert":
+                    raise StandinError(f"duplicate key value violates unique constraint on {query.table}")
+                existing.update(values)
+                existing["updated_at"] = datetime.now().isoformat()
+                written.append(existing)
+            else:
+                now = datetime.now().isoformat()
+                row = {"created_at": now, "updated_at": now}
+                if primary_key == "id":
+                    row["id"] = str(uuid.uuid4())
+                row.update(values)
+                rows.append(row)
+                written.append(row)
+        return written
+
+    def _cascade(self, table: str, deleted: List[dict]):
+        for child_table, column in CASCADES.get(table, []):
+            keys = {row.get(column) for row in deleted}
+            if keys and child_table in self.tables:
+                self.tables[child_table] = [row for row in self.tables[child_table] if row.get(column) not in keys]
+
+
+STANDIN_TOKEN_ADDRESS = "0xCaC524BcA292aaade2DF8A05cC58F0a65B1B3bB9"
+STANDIN_PAYMENT_HUB_ADDRESS = "0x728d0f06Bf6D63B4bC9ca7C879D042DDAC66e8A3"
+STANDIN_BASE_FEE_WEI = 1_000_000_000
+
+# Gas charged by the stand-in (roughly what the real contracts use)
+PLAIN_TRANSFER_GAS = 21000
+TOKEN_TRANSFER_GAS = 52000
+BATCH_BASE_GAS = 35000
+BATCH_CHARGED_ITEM_GAS = 72000
+BATCH_SKIPPED_ITEM_GAS = 18000
+
+
+def future_outcome(future, timeout: float = 5.0) -> str:
+    """'confirmed', or the exception type name, of a payment's future"""
+    error = future.exception(timeout=timeout)
+    return type(error).__name__ if error else "confirmed"
+
+
+def _int(value: bytes) -> int:
+    return int.from_bytes(value, "big")
+
+
+def decode_transaction(raw: bytes) -> Tuple[int, int, bytes, bytes]:
+    """(nonce, gas, to, data) of a signed legacy, EIP-2930 or EIP-1559 transaction"""
+    import rlp
+
+    if raw[0] == 2:
+        fields = rlp.decode(raw[1:])
+        return _int(fields[1]), _int(fields[4]), fields[5], fields[7]
+    if raw[0] == 1:
+        fields = rlp.decode(raw[1:])
+        return _int(fields[1]), _int(fields[3]), fields[4], fields[6]
+    fields = rlp.decode(raw)
+    return _int(fields[0]), _int(fields[2]), fields[3], fields[5]
+
+
+def _selector(signature: str) -> bytes:
+    from eth_utils import keccak
+
+    return keccak(text=signature)[:4]
+
+
+TRANSFER_SELECTOR = _selector("transfer(address,uint256)")
+CHARGE_BATCH_SELECTOR = _selector("chargeBatch(address[],uint256[])")
+
+
+class _ContractCall:
+    """A bound contract function: `.call()`, `.estimate_gas()`, `.build_transaction()`"""
+
+    def __init__(self, contract, result: Callable[[], Any], data: bytes = b""):
+        self._contract = contract
+        self._result = result
+        self._data = data
+
+    def call(self):
+        self._contract.chain.simulate_latency()
+        return self._result()
+
+    def estimate_gas(self, tx: Optional[dict] = None) -> int:
+        self._contract.chain.simulate_latency()
+        sender = (tx or {}).get("from", "0x" + "00" * 20)
+        return self._contract.chain.estimate(sender.lower(), self._contract.address.lower(), self._data)
+
+    def build_transaction(self, tx_params: dict) -> dict:
+        tx = dict(tx_params)
+        tx.update({"to": self._contract.address, "value": 0, "data": "0x" + self._data.hex()})
+        return tx
+
+
+class _EventType:
+    def __init__(self, contract, name: str):
+        self._contract = contract
+        self._name = name
+
+    def process_receipt(self, receipt: dict, errors=None) -> List[dict]:
+        address = self._contract.address.lower()
+        return [log for log in receipt.get("logs", [])
+                if log["address"].lower() == address and log["event"] == self._name]
+
+
+class _Events:
+    def __init__(self, contract):
+        self._contract = contract
+
+    def __getattr__(self, name: str):
+        return lambda: _EventType(self._contract, name)
+
+
+class _TokenFunctions:
+    def __init__(self, token: "InMemoryToken"):
+        self._token = token
+
+    def transfer(self, to: str, amount: int) -> _ContractCall:
+        data = TRANSFER_SELECTOR + bytes.fromhex(to[2:].rjust(64, "0")) + amount.to_bytes(32, "big")
+        return _ContractCall(self._token, lambda: True, data)
+
+    def balanceOf(self, account: str) -> _ContractCall:
+        return _ContractCall(self._token, lambda: self._token.chain.balance_of(account))
+
+    def allowance(self, owner: str, spender: str) -> _ContractCall:
+        return _ContractCall(self._token, lambda: self._token.chain.allowance_of(owner, spender))
+
+    def decimals(self) -> _ContractCall:
+        return _ContractCall(self._token, lambda: self._token.decimals)
+
+
+class InMemoryToken:
+    """ERC-20 stand-in exposing `.functions` / `.events` like a web3 Contract"""
+
+    def __init__(self, chain: "InMemoryChain", address: str, decimals: int):
+        self.chain = chain
+        self.address = address
+        self.decimals = decimals
+        self.functions = _TokenFunctions(self)
+        self.events = _Events(self)
+
+
+class _PaymentHubFunctions:
+    def __init__(self, hub: "InMemoryPaymentHub"):
+        self._hub = hub
+
+    def chargeBatch(self, customers: List[str], amounts: List[int]) -> _ContractCall:
+        from eth_abi import encode
+
+        data = CHARGE_BATCH_SELECTOR + encode(["address[]", "uint256[]"], [customers, amounts])
+        return _ContractCall(self._hub, lambda: None, data)
+
+
+class InMemoryPaymentHub:
+    """PaymentHub.chargeBatch stand-in: charges each customer's allowance to
+    the sender, or emits ChargeSkipped for that item (see PaymentHub.sol)"""
+
+    def __init__(self, chain: "InMemoryChain", address: str):
+        self.chain = chain
+        self.address = address
+        self.functions = _PaymentHubFunctions(self)
+        self.events = _Events(self)
+
+
+class _Eth:
+    def __init__(self, chain: "InMemoryChain"):
+        self._chain = chain
+
+    def get_transaction_count(self, address: str, block_identifier: str = "latest") -> int:
+        self._chain.simulate_latency()
+        return self._chain.transaction_count(address, pending=block_identifier == "pending")
+
+    def send_raw_transaction(self, raw_transaction) -> bytes:
+        self._chain.simulate_latency()
+        return self._chain.accept(bytes(raw_transaction))
+
+    def get_transaction_receipt(self, tx_hash) -> Optional[dict]:
+        self._chain.simulate_latency()
+        return self._chain.receipt(tx_hash)
+
+    def get_block(self, block_identifier) -> dict:
+        self._chain.simulate_latency()
+        return {"number": self._chain.block_number, "baseFeePerGas": STANDIN_BASE_FEE_WEI, "timestamp": int(time.time())}
+
+    @property
+    def gas_price(self) -> int:
+        return STANDIN_BASE_FEE_WEI
+
+    @property
+    def max_priority_fee(self) -> int:
+        return STANDIN_BASE_FEE_WEI
+
+
+class InMemoryChain:
+    """Web3 stand-in: one ERC-20 ledger, an optional PaymentHub, a mempool
+    and a block every `block_time`.
+
+    Transactions are mined per sender in nonce order (a gap stalls later
+    ones, like a real node). A transfer larger than the sender's balance,
+    or a transaction whose gas limit is below what it uses, is mined with
+    status 0. A new transaction for a queued nonce replaces the queued one
+    (fees are not modelled) and `drop` simulates eviction. Receipts carry
+    decoded `logs` ({address, event, args}) for `events.X().process_receipt`.
+    """
+
+    def __init__(self, chain_id: int = 11155111, block_time: float = 1.0, rpc_latency: float = 0.0,
+                 token_address: str = STANDIN_TOKEN_ADDRESS, decimals: int = 6):
+        from eth_account import Account
+        from eth_utils import keccak, to_checksum_address, to_wei
+
+        self._recover_sender = Account.recover_transaction
+        self._keccak = keccak
+        self.to_checksum_address = to_checksum_address
+        self.to_wei = to_wei
+
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.rpc_latency = rpc_latency
+        self.eth = _Eth(self)
+        self.token = InMemoryToken(self, to_checksum_address(token_address), decimals)
+        self.hub: Optional[InMemoryPaymentHub] = None
+
+        self.block_number = 0
+        self.transactions_mined = 0
+        self._balances: Dict[str, int] = {}
+        self._allowances: Dict[Tuple[str, str], int] = {}
+        self._nonces: Dict[str, int] = {}
+        self._mempool: Dict[str, Dict[int, Tuple[str, int, bytes, bytes]]] = {}
+        self._receipts: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._miner = threading.Thread(target=self._mine_loop, name="standin-miner", daemon=True)
+        self._miner.start()
+
+    def simulate_latency(self):
+        if self.rpc_latency:
+            time.sleep(self.rpc_latency)
+
+    def payment_hub(self, address: str = STANDIN_PAYMENT_HUB_ADDRESS) -> InMemoryPaymentHub:
+        """Deploy (once) and return the PaymentHub stand-in"""
+        if self.hub is None:
+            self.hub = InMemoryPaymentHub(self, self.to_checksum_address(address))
+        return self.hub
+
+    # Ledger
+
+    def funded_wallet(self, amount_wei: int = 10 ** 12) -> dict:
+        """A new account holding `amount_wei` tokens, as an executor wallet dict"""
+        from eth_account import Account
+
+        account = Account.create()
+        self.mint(account.address, amount_wei)
+        return {"address": account.address, "private_key": account.key.hex()}
+
+    def mint(self, address: str, amount_wei: int):
+        with self._lock:
+            key = address.lower()
+            self._balances[key] = self._balances.get(key, 0) + amount_wei
+
+    def approve(self, owner: str, spender: str, amount_wei: int):
+        with self._lock:
+            self._allowances[(owner.lower(), spender.lower())] = amount_wei
+
+    def balance_of(self, address: str) -> int:
+        with self._lock:
+            return self._balances.get(address.lower(), 0)
+
+    def allowance_of(self, owner: str, spender: str) -> int:
+        with self._lock:
+            return self._allowances.get((owner.lower(), spender.lower()), 0)
+
+    def transaction_count(self, address: str, pending: bool = False) -> int:
+        key = address.lower()
+        with self._lock:
+            nonce = self._nonces.get(key, 0)
+            if pending:
+                queued = self._mempool.get(key, {})
+                while nonce in queued:
+                    nonce += 1
+            return nonce
+
+    # Transactions
+
+    def accept(self, raw: bytes) -> bytes:
+        sender = self._recover_sender(raw).lower()
+        nonce, gas, to, data = decode_transaction(raw)
+        tx_hash = self._keccak(raw)
+        with self._lock:
+            queued = self._mempool.setdefault(sender, {})
+            if nonce < self._nonces.get(sender, 0):
+                raise ValueError("nonce too low")
+            if nonce in queued and queued[nonce][0] == "0x" + tx_hash.hex():
+                raise ValueError("already known")
+            queued[nonce] = ("0x" + tx_hash.hex(), gas, to, data)
+        return tx_hash
+
+    def drop(self, tx_hash) -> bool:
+        """Evict a queued transaction, as a node may under mempool pressure"""
+        if isinstance(tx_hash, (bytes, bytearray)):
+            tx_hash = tx_hash.hex()
+        key = "0x" + tx_hash.lower().replace("0x", "")
+        with self._lock:
+            for queued in self._mempool.values():
+                for nonce, tx in list(queued.items()):
+                    if tx[0] == key:
+                        del queued[nonce]
+                        return True
+        return False
+
+    def receipt(self, tx_hash) -> Optional[dict]:
+        if isinstance(tx_hash, (bytes, bytearray)):
+            tx_hash = tx_hash.hex()
+        key = "0x" + tx_hash.lower().replace("0x", "")
+        with self._lock:
+            return self._receipts.get(key)
+
+    def _token_transfer(self, sender: str, recipient: str, amount: int, logs: List[dict]) -> bool:
+        if self._balances.get(sender, 0) < amount:
+            return False
+        self._balances[sender] -= amount
+        self._balances[recipient] = self._balances.get(recipient, 0) + amount
+        logs.append({"address": self.token.address, "event": "Transfer",
+                     "args": {"from": sender, "to": recipient, "value": amount}})
+        return True
+
+    def _execute(self, sender: str, to: str, data: bytes, logs: List[dict]) -> Tuple[bool, int]:
+        """Run a call against the ledger, appending its logs; (success, gas used)"""
+        if to == self.token.address.lower() and data[:4] == TRANSFER_SELECTOR:
+            recipient = "0x" + data[16:36].hex()
+            amount = int.from_bytes(data[36:68], "big")
+            return self._token_transfer(sender, recipient, amount, logs), TOKEN_TRANSFER_GAS
+
+        if self.hub and to == self.hub.address.lower() and data[:4] == CHARGE_BATCH_SELECTOR:
+            from eth_abi import decode
+
+            customers, amounts = decode(["address[]", "uint256[]"], data[4:])
+            if len(customers) != len(amounts):
+                return False, BATCH_BASE_GAS
+            gas = BATCH_BASE_GAS
+            hub = self.hub.address.lower()
+            for i, (customer, amount) in enumerate(zip(customers, amounts)):
+                customer = customer.lower()
+                allowance = self._allowances.get((customer, hub), 0)
+                if amount == 0 or allowance < amount or not self._token_transfer(customer, sender, amount, logs):
+                    logs.append({"address": self.hub.address, "event": "ChargeSkipped",
+                                 "args": {"index": i, "customer": customer, "amount": amount}})
+                    gas += BATCH_SKIPPED_ITEM_GAS
+                    continue
+                self._allowances[(customer, hub)] = allowance - amount
+                logs.append({"address": self.hub.address, "event": "Charged",
+                             "args": {"customer": customer, "merchant": sender, "amount": amount,
+                                      "timestamp": int(time.time())}})
+                gas += BATCH_CHARGED_ITEM_GAS
+            return True, gas
+
+        return True, PLAIN_TRANSFER_GAS
+
+    def estimate(self, sender: str, to: str, data: bytes) -> int:
+        """Gas the call would use against the current state (state is not changed)"""
+        with self._lock:
+            balances, allowances = dict(self._balances), dict(self._allowances)
+            try:
+                return self._execute(sender, to, data, [])[1]
+            finally:
+                self._balances, self._allowances = balances, allowances
+
+    def mine(self):
+        """Include every transaction whose nonce is next for its sender"""
+        with self._lock:
+            self.block_number += 1
+            for sender, queued in self._mempool.items():
+                nonce = self._nonces.get(sender, 0)
+                while nonce in queued:
+                    tx_hash, gas_limit, to, data = queued.pop(nonce)
+                    balances, allowances = dict(self._balances), dict(self._allowances)
+                    logs: List[dict] = []
+                    success, gas_used = self._execute(sender, "0x" + to.hex(), data, logs)
+                    if gas_used > gas_limit:
+                        success, gas_used = False, gas_limit  # out of gas
+                    if not success:
+                        # Reverted: no state changes and no logs
+                        self._balances, self._allowances, logs = balances, allowances, []
+                    self._receipts[tx_hash] = {
+                        "transactionHash": tx_hash,
+                        "blockNumber": self.block_number,
+                        "from": sender,
+                        "status": 1 if success else 0,
+                        "gasUsed": gas_used,
+                        "logs": logs,
+                    }
+                    self.transactions_mined += 1
+                    nonce += 1
+                self._nonces[sender] = nonce
+
+    def _mine_loop(self):
+        while not self._stop.wait(self.block_time):
+            self.mine()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(queued) for queued in self._mempool.values())
+
+    def stop(self):
+        self._stop.set()
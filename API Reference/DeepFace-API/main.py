@@ -7,14 +7,23 @@ Supports face registration, recognition, and blockchain integration
 
 import os
 import base64
+import hashlib
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from supabase import create_client, Client
 from deepface import DeepFace
 import uvicorn
+from single_flight import SingleFlight
+from face_index import EmbeddingIndex, ModelSettings, embed_image_bytes, embed_image_path, embed_image_paths, store_embeddings
+from enrollment_queue import EnrollmentJob, EnrollmentQueue
+from inference_backend import get_backend
 
 # Configuration from environment variables
 SUPABASE_URL = os.getenv("SUPABASE_URL", "https://nugfkvafpxuaspphxxmd.supabase.co")
@@ -22,6 +31,11 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "eyJhbGciOiJIUzI1NiIsIn
 DEEPFACE_MODEL = os.getenv("DEEPFACE_MODEL", "VGG-Face")
 DEEPFACE_DETECTOR = os.getenv("DEEPFACE_DETECTOR", "opencv")
 CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.4"))
+# Compare each recognition against the shadow model while a re-embed is running
+DUAL_READ_SHADOW = os.getenv("DUAL_READ_SHADOW", "false").lower() == "true"
+DUAL_READ_MAX_PENDING = int(os.getenv("DUAL_READ_MAX_PENDING", "4"))
+ENROLLMENT_WORKERS = int(os.getenv("ENROLLMENT_WORKERS", "2"))
+ENROLLMENT_BATCH_SIZE = int(os.getenv("ENROLLMENT_BATCH_SIZE", "8"))
 
 # Wallet configurations
 WALLETS = {
@@ -54,8 +68,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+# Initialize Supabase client (LOCAL_STANDINS=true swaps in the in-memory
+# stand-in used by load_test.py)
+if os.getenv("LOCAL_STANDINS", "false").lower() == "true":
+    from local_standins import InMemorySupabase
+    supabase = InMemorySupabase.from_env()
+else:
+    supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+
+# Identical uploads in flight at the same time (double taps, client retries)
+# share one recognition run, keyed by the SHA-256 of the image bytes
+recognition_flight = SingleFlight()
+
+# DEEPFACE_MODEL / CONFIDENCE_THRESHOLD are only the defaults; the active
+# model is switched at runtime by reembed_job.py cutover via app_settings
+model_settings = ModelSettings(supabase, DEEPFACE_MODEL, CONFIDENCE_THRESHOLD)
+face_indexes: Dict[str, EmbeddingIndex] = {}
+dual_read_pool = ThreadPoolExecutor(max_workers=1)
+# Comparisons are a sample: when the pool is this far behind, new ones are
+# dropped instead of queueing uploaded images without bound
+dual_read_slots = threading.BoundedSemaphore(DUAL_READ_MAX_PENDING)
+dual_read_stats = {"compared": 0, "agreed": 0, "disagreed": 0, "errors": 0, "dropped": 0}
+
+def get_face_index(model_name: str) -> EmbeddingIndex:
+    """Embedding index for a model, created on first use"""
+    if model_name not in face_indexes:
+        face_indexes[model_name] = EmbeddingIndex(supabase, model_name)
+    return face_indexes[model_name]
+
+def update_face_indexes(wallets: Dict[str, str], stored: Dict[str, Dict[str, list]]):
+    """Apply this replica's writes to the loaded indexes instead of reloading them.
+    
+    `wallets` maps every user whose embeddings were replaced (or deleted) to
+    their wallet; `stored` maps model -> {user_id: embedding} written for them.
+    Users without a stored embedding for an index's model are dropped from it.
+    """
+    for model_name, index in list(face_indexes.items()):
+        embedded = stored.get(model_name, {})
+        index.remove([user_id for user_id in wallets if user_id not in embedded])
+        index.upsert({user_id: (wallets[user_id], embedding) for user_id, embedding in embedded.items()})
+
+def compare_with_shadow(content: bytes, shadow_model: str, primary_user_id: Optional[str]):
+    """Dual-read: would the shadow model have picked the same user?"""
+    try:
+        embedding = embed_image_bytes(content, shadow_model, DEEPFACE_DETECTOR)
+        match = get_face_index(shadow_model).match(embedding)
+        shadow_user_id = match[0] if match else None
+        dual_read_stats["compared"] += 1
+        if shadow_user_id == primary_user_id:
+            dual_read_stats["agreed"] += 1
+        else:
+            dual_read_stats["disagreed"] += 1
+            print(f"🌓 Shadow {shadow_model} disagrees: {shadow_user_id} vs {primary_user_id}")
+    except Exception as e:
+        dual_read_stats["errors"] += 1
+        print(f"⚠️ Shadow comparison failed: {e}")
+    finally:
+        dual_read_slots.release()
 
 def save_temp_image(file_content: bytes) -> str:
     """Save uploaded file content to a temporary file"""
@@ -95,23 +164,219 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    settings = model_settings.snapshot()
+    # SQLite can block on a worker's write lock; keep it off the event loop
+    enrollment_jobs = await run_in_threadpool(enrollment_queue.counts)
     return {
         "status": "ok",
         "deepface_available": True,
         "timestamp": datetime.now().isoformat(),
-        "model": DEEPFACE_MODEL,
+        "model": settings.active_model,
+        "model_indexed": settings.active_model_indexed,
+        "shadow_model": settings.shadow_model,
+        "dual_read": dual_read_stats if DUAL_READ_SHADOW else None,
         "detector": DEEPFACE_DETECTOR,
-        "threshold": CONFIDENCE_THRESHOLD,
+        "inference_backend": get_backend().name,
+        "threshold": settings.active_threshold,
+        "recognition_coalescing": recognition_flight.stats(),
+        "enrollment_jobs": enrollment_jobs,
         "deployment": "render"
     }
 
+def face_detected(image_path: str) -> bool:
+    """Whether DeepFace finds at least one face in the image"""
+    try:
+        face_objs = DeepFace.extract_faces(
+            img_path=image_path,
+            detector_backend=DEEPFACE_DETECTOR,
+            enforce_detection=True
+        )
+        return len(face_objs) > 0
+    except Exception as face_error:
+        print(f"⚠️ Face detection failed for {os.path.basename(image_path)}: {face_error}")
+        return False
+
+def embed_first_images(accepted: dict, model_name: str) -> tuple:
+    """Embedding of each accepted user's first face image, as
+    ({user_id: embedding}, {user_id: error}).
+    
+    The batch is embedded in one call; if that fails it is retried per
+    user so one bad image only fails its own registration.
+    """
+    user_ids = list(accepted)
+    paths = [face_images[0] for _, face_images in accepted.values()]
+    try:
+        return dict(zip(user_ids, embed_image_paths(paths, model_name, DEEPFACE_DETECTOR))), {}
+    except Exception as batch_error:
+        print(f"⚠️ Batch embedding with {model_name} failed, retrying per user: {batch_error}")
+    
+    embeddings, errors = {}, {}
+    for user_id, path in zip(user_ids, paths):
+        try:
+            embeddings[user_id] = embed_image_path(path, model_name, DEEPFACE_DETECTOR)
+        except Exception as e:
+            errors[user_id] = str(e)
+    return embeddings, errors
+
+def replace_registrations(rows: List[dict], embeddings: Dict[str, Dict[str, list]], active_model: str) -> dict:
+    """Write registrations and their per-model embeddings; returns what was stored.
+    
+    New embeddings overwrite the old ones (upsert per user and model) instead
+    of being deleted first, and the previous face_embeddings rows are put back
+    if the active model's embeddings can't be written, so a failed batch never
+    leaves a user with a new face image and no embedding. Only rows of models
+    that weren't rewritten are deleted.
+    """
+    user_ids = [row["user_id"] for row in rows]
+    previous = supabase.table('face_embeddings').select('*').in_('user_id', user_ids).execute().data or []
+    
+    # Replace the registrations in one round trip (the row must exist
+    # before its embeddings reference it)
+    supabase.table('face_embeddings').upsert(rows, on_conflict="user_id").execute()
+    try:
+        if embeddings.get(active_model):
+            store_embeddings(supabase, list(embeddings[active_model]), active_model, list(embeddings[active_model].values()))
+    except Exception:
+        restore_registrations(user_ids, previous)
+        raise
+    stored = {active_model: embeddings[active_model]} if embeddings.get(active_model) else {}
+    
+    for model_name, model_embeddings in embeddings.items():
+        if model_name == active_model or not model_embeddings:
+            continue
+        try:
+            store_embeddings(supabase, list(model_embeddings), model_name, list(model_embeddings.values()))
+            stored[model_name] = model_embeddings
+        except Exception as shadow_error:
+            # Not fatal: the cutover catch-up pass embeds users without a shadow row
+            print(f"⚠️ Storing {model_name} embeddings failed: {shadow_error}")
+    
+    # Embeddings of the old face images that weren't overwritten above
+    stale = supabase.table('face_model_embeddings').delete().in_('user_id', user_ids)
+    for model_name in stored:
+        stale = stale.neq('model_name', model_name)
+    stale.execute()
+    for model_name, model_embeddings in stored.items():
+        not_rewritten = [user_id for user_id in user_ids if user_id not in model_embeddings]
+        if not_rewritten:
+            supabase.table('face_model_embeddings').delete().in_('user_id', not_rewritten) \
+                .eq('model_name', model_name).execute()
+    return stored
+
+def restore_registrations(user_ids: List[str], previous: List[dict]):
+    """Undo a face_embeddings upsert: put the old rows back and remove new users"""
+    try:
+        if previous:
+            supabase.table('face_embeddings').upsert(previous, on_conflict="user_id").execute()
+        existed = {row["user_id"] for row in previous}
+        new_users = [user_id for user_id in user_ids if user_id not in existed]
+        if new_users:
+            supabase.table('face_embeddings').delete().in_('user_id', new_users).execute()
+    except Exception as e:
+        print(f"⚠️ Could not restore previous registrations for {user_ids}: {e}")
+
+def process_enrollment_batch(jobs: List[EnrollmentJob]) -> dict:
+    """Detect, store and embed a batch of registrations.
+    
+    Database writes and embeddings are done once per batch rather than
+    once per user. Embeddings are computed before anything is written, so
+    a user whose embedding fails gets a failed job and no partial rows
+    while the rest of the batch is registered. Returns {job_id: (result, error)}.
+    """
+    outcomes = {}
+    accepted = {}
+    
+    for job in jobs:
+        print(f"🎭 Registering face for user {job.user_id} with {len(job.image_paths)} images")
+        face_images = [path for path in job.image_paths if face_detected(path)]
+        if not face_images:
+            outcomes[job.id] = (None, "No faces detected in any image")
+            continue
+        # If a user shows up twice in one batch, the newest submission wins
+        previous = accepted.get(job.user_id)
+        if previous:
+            outcomes[previous[0].id] = (None, "Superseded by a newer registration")
+        accepted[job.user_id] = (job, face_images)
+    
+    if not accepted:
+        return outcomes
+    
+    # Keep the active index and any shadow index being back-filled complete.
+    # One snapshot for the batch, so a cutover can't pair the old active
+    # model with an already cleared shadow model
+    settings = model_settings.snapshot()
+    active_model = settings.active_model
+    active_embeddings = {}
+    if settings.active_model_indexed:
+        active_embeddings, errors = embed_first_images(accepted, active_model)
+        for user_id, error in errors.items():
+            job, _ = accepted.pop(user_id)
+            print(f"❌ Embedding failed for {user_id}: {error}")
+            outcomes[job.id] = (None, f"Face embedding failed: {error}")
+        if not accepted:
+            return outcomes
+    shadow_model = settings.shadow_model
+    shadow_embeddings = {}
+    if shadow_model:
+        # Not fatal: users left without a shadow row are caught up at cutover
+        shadow_embeddings, errors = embed_first_images(accepted, shadow_model)
+        for user_id, error in errors.items():
+            print(f"⚠️ Shadow embedding failed for {user_id}: {error}")
+    
+    rows = [{
+        "user_id": job.user_id,
+        "wallet_address": job.wallet_address,
+        # Store in Supabase (simplified - using first image only)
+        "face_data": image_to_base64(face_images[0]),
+        "model_used": active_model,
+        "created_at": datetime.now().isoformat()
+    } for job, face_images in accepted.values()]
+    
+    embeddings = {active_model: active_embeddings}
+    if shadow_model:
+        embeddings[shadow_model] = shadow_embeddings
+    try:
+        stored = replace_registrations(rows, embeddings, active_model)
+    except Exception as e:
+        print(f"Registration error: {e}")
+        for job, _ in accepted.values():
+            outcomes[job.id] = (None, f"Face registration failed: {str(e)}")
+        return outcomes
+    update_face_indexes({job.user_id: job.wallet_address for job, _ in accepted.values()}, stored)
+    
+    for job, face_images in accepted.values():
+        print(f"🎉 Successfully registered {job.user_id} with {len(face_images)} face images")
+        outcomes[job.id] = ({
+            "success": True,
+            "userId": job.user_id,
+            "walletAddress": job.wallet_address,
+            "imagesProcessed": len(face_images),
+            "totalImages": len(job.image_paths),
+            "model": active_model
+        }, None)
+    return outcomes
+
+enrollment_queue = EnrollmentQueue(
+    process_enrollment_batch,
+    workers=ENROLLMENT_WORKERS,
+    batch_size=ENROLLMENT_BATCH_SIZE
+)
+
+@app.on_event("startup")
+async def start_enrollment_workers():
+    enrollment_queue.start()
+
+@app.on_event("shutdown")
+async def stop_enrollment_workers():
+    enrollment_queue.stop()
+
 @app.post("/register-face")
 async def register_face(
     userId: str = Form(...),
     walletAddress: str = Form(...),
     images: List[UploadFile] = File(...)
 ):
-    """Register a user's face using multiple training images"""
+    """Queue a user's face registration; poll /enrollment-jobs/{jobId} for the result"""
     
     if not images or len(images) == 0:
         raise HTTPException(status_code=400, detail="No images provided")
@@ -119,87 +384,89 @@ async def register_face(
     if len(images) > 5:
         raise HTTPException(status_code=400, detail="Maximum 5 images allowed")
     
-    print(f"🎭 Registering face for user {userId} with {len(images)} images")
+    uploads = [(image.filename, await image.read()) for image in images]
+    # Spooling and the SQLite insert block; keep them off the event loop
+    job_id = await run_in_threadpool(enrollment_queue.submit, userId, walletAddress, uploads)
+    print(f"📥 Queued registration for user {userId} with {len(images)} images (job {job_id})")
     
-    temp_files = []
-    processed_images = []
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "jobId": job_id,
+        "status": "queued",
+        "statusUrl": f"/enrollment-jobs/{job_id}",
+        "userId": userId,
+        "walletAddress": walletAddress,
+        "totalImages": len(images)
+    })
+
+@app.get("/enrollment-jobs/{job_id}")
+async def get_enrollment_job(job_id: str):
+    """Status and result of a queued registration"""
+    job = await run_in_threadpool(enrollment_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Enrollment job not found")
+    return job
+
+def verify_against_gallery(temp_file: str, comparison_files: List[str], model_name: str, threshold: float) -> Optional[dict]:
+    """Best match by verifying the probe against every stored face image"""
     
-    try:
-        # Process each uploaded image
-        for i, image in enumerate(images):
-            print(f"Processing image {i+1}: {image.filename}")
-            
-            # Save to temporary file
-            content = await image.read()
-            temp_path = save_temp_image(content)
-            temp_files.append(temp_path)
-            
-            # Verify face exists in image using DeepFace
-            try:
-                # Simple face detection
-                face_objs = DeepFace.extract_faces(
-                    img_path=temp_path,
-                    detector_backend=DEEPFACE_DETECTOR,
-                    enforce_detection=True
-                )
-                
-                if len(face_objs) > 0:
-                    print(f"✅ Face detected in image {i+1}")
-                    # Convert image to base64 for storage
-                    image_b64 = image_to_base64(temp_path)
-                    processed_images.append({
-                        "image_data": image_b64,
-                        "filename": image.filename
-                    })
-                else:
-                    print(f"⚠️ No face detected in image {i+1}")
-                    
-            except Exception as face_error:
-                print(f"⚠️ Face detection failed for image {i+1}: {face_error}")
-                continue
-        
-        if len(processed_images) == 0:
-            raise HTTPException(status_code=400, detail="No faces detected in any image")
+    # Get all registered users from database
+    registered_users = supabase.table('face_embeddings').select('*').execute()
+    
+    if not registered_users.data or len(registered_users.data) == 0:
+        raise HTTPException(status_code=404, detail="No registered users found")
+    
+    best_match = None
+    best_distance = float('inf')
+    
+    # Compare with each registered user
+    for user in registered_users.data:
+        user_id = user['user_id']
+        wallet_address = user['wallet_address']
+        stored_face_data = user.get('face_data')
         
-        # Store in Supabase (simplified - using first image only)
-        first_image = processed_images[0]
-        face_data = {
-            "user_id": userId,
-            "wallet_address": walletAddress,
-            "face_data": first_image["image_data"],  # Store base64 image data
-            "created_at": datetime.now().isoformat()
-        }
+        if not stored_face_data:
+            print(f"No face data for user {user_id}")
+            continue
+            
+        print(f"Comparing with user {user_id}")
         
-        # First, try to delete any existing entry for this user
         try:
-            delete_result = supabase.table('face_embeddings').delete().eq('user_id', userId).execute()
-            if delete_result.data:
-                print(f"🗑️ Deleted existing registration for user {userId}")
-        except Exception as delete_error:
-            print(f"⚠️ No existing user to delete or delete failed: {delete_error}")
-        
-        # Now insert the new data
-        result = supabase.table('face_embeddings').insert(face_data).execute()
-        
-        print(f"🎉 Successfully registered {userId} with {len(processed_images)} face images")
-        
-        return {
-            "success": True,
-            "userId": userId,
-            "walletAddress": walletAddress,
-            "imagesProcessed": len(processed_images),
-            "totalImages": len(images),
-            "model": DEEPFACE_MODEL
-        }
+            # Convert stored base64 image back to file
+            comparison_path = save_temp_image(base64.b64decode(stored_face_data))
+            comparison_files.append(comparison_path)
+            
+            # Use DeepFace to verify faces
+            result = DeepFace.verify(
+                img1_path=temp_file,
+                img2_path=comparison_path,
+                model_name=model_name,
+                detector_backend=DEEPFACE_DETECTOR,
+                enforce_detection=False
+            )
+            
+            distance = result['distance']
+            verified = result['verified']
+            
+            print(f"  Distance: {distance:.4f}, Verified: {verified}")
+            
+            user_best_distance = distance
+            
+        except Exception as compare_error:
+            print(f"  Comparison error: {compare_error}")
+            continue
         
-    except Exception as e:
-        print(f"Registration error: {e}")
-        raise HTTPException(status_code=500, detail=f"Face registration failed: {str(e)}")
+        # Check if this is the best match so far
+        if user_best_distance < best_distance and user_best_distance < threshold:
+            best_distance = user_best_distance
+            best_match = {
+                "userId": user_id,
+                "walletAddress": wallet_address,
+                "distance": user_best_distance,
+                "confidence": user_best_distance
+            }
     
-    finally:
-        # Clean up temporary files
-        for temp_file in temp_files:
-            cleanup_temp_file(temp_file)
+    return best_match
 
 @app.post("/recognize-face")
 async def recognize_face(image: UploadFile = File(...)):
@@ -207,12 +474,23 @@ async def recognize_face(image: UploadFile = File(...)):
     
     print(f"🔍 Processing face recognition for: {image.filename}")
     
+    content = await image.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+    
+    # Runs off the event loop so duplicates can join while it is in progress
+    return await recognition_flight.run(
+        content_hash,
+        lambda: run_in_threadpool(recognize_image_content, content)
+    )
+
+def recognize_image_content(content: bytes) -> dict:
+    """Run the full recognition pipeline for one uploaded image"""
+    
     temp_file = None
     comparison_files = []
     
     try:
         # Save uploaded image to temporary file
-        content = await image.read()
         temp_file = save_temp_image(content)
         
         # Verify face exists in uploaded image
@@ -231,61 +509,39 @@ async def recognize_face(image: UploadFile = File(...)):
         
         print("✅ Face detected, comparing with registered users...")
         
-        # Get all registered users from database
-        registered_users = supabase.table('face_embeddings').select('*').execute()
-        
-        if not registered_users.data or len(registered_users.data) == 0:
-            raise HTTPException(status_code=404, detail="No registered users found")
-        
+        # One snapshot per request: model and threshold must match
+        settings = model_settings.snapshot()
+        active_model = settings.active_model
+        threshold = settings.active_threshold
         best_match = None
-        best_distance = float('inf')
         
-        # Compare with each registered user
-        for user in registered_users.data:
-            user_id = user['user_id']
-            wallet_address = user['wallet_address']
-            stored_face_data = user.get('face_data')
-            
-            if not stored_face_data:
-                print(f"No face data for user {user_id}")
-                continue
-                
-            print(f"Comparing with user {user_id}")
-            
-            try:
-                # Convert stored base64 image back to file
-                comparison_path = save_temp_image(base64.b64decode(stored_face_data))
-                comparison_files.append(comparison_path)
-                
-                # Use DeepFace to verify faces
-                result = DeepFace.verify(
-                    img1_path=temp_file,
-                    img2_path=comparison_path,
-                    model_name=DEEPFACE_MODEL,
-                    detector_backend=DEEPFACE_DETECTOR,
-                    enforce_detection=False
-                )
-                
-                distance = result['distance']
-                verified = result['verified']
-                
-                print(f"  Distance: {distance:.4f}, Verified: {verified}")
-                
-                user_best_distance = distance
-                
-            except Exception as compare_error:
-                print(f"  Comparison error: {compare_error}")
-                continue
-            
-            # Check if this is the best match so far
-            if user_best_distance < best_distance and user_best_distance < CONFIDENCE_THRESHOLD:
-                best_distance = user_best_distance
+        if settings.active_model_indexed:
+            # One embedding for the probe, then a vectorised search of the gallery
+            match = get_face_index(active_model).match(
+                embed_image_path(temp_file, active_model, DEEPFACE_DETECTOR)
+            )
+            if match is None:
+                raise HTTPException(status_code=404, detail="No registered users found")
+            user_id, wallet_address, distance = match
+            print(f"  Nearest: {user_id}, Distance: {distance:.4f}")
+            if distance < threshold:
                 best_match = {
                     "userId": user_id,
                     "walletAddress": wallet_address,
-                    "distance": user_best_distance,
-                    "confidence": user_best_distance
+                    "distance": distance,
+                    "confidence": distance
                 }
+        else:
+            best_match = verify_against_gallery(temp_file, comparison_files, active_model, threshold)
+        
+        shadow_model = settings.shadow_model
+        if DUAL_READ_SHADOW and shadow_model:
+            if dual_read_slots.acquire(blocking=False):
+                dual_read_pool.submit(
+                    compare_with_shadow, content, shadow_model, best_match["userId"] if best_match else None
+                )
+            else:
+                dual_read_stats["dropped"] += 1
         
         # Clean up comparison files
         for comp_file in comparison_files:
@@ -300,8 +556,8 @@ async def recognize_face(image: UploadFile = File(...)):
                 "walletAddress": best_match["walletAddress"],
                 "distance": best_match["distance"],
                 "confidence": best_match["confidence"],
-                "threshold": CONFIDENCE_THRESHOLD,
-                "model": DEEPFACE_MODEL
+                "threshold": threshold,
+                "model": active_model
             }
         else:
             print("❌ No matching face found")
@@ -341,6 +597,8 @@ async def delete_user(user_id: str):
         result = supabase.table('face_embeddings').delete().eq('user_id', user_id).execute()
         
         if result.data:
+            # Per-model embeddings go with the row (ON DELETE CASCADE)
+            update_face_indexes({user_id: ""}, {})
             return {"success": True, "message": f"User {user_id} deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="User not found")
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+FacePay Payment Executor
+Pipelined PyUSD transfer submission with a local per-wallet nonce allocator
+and asynchronous receipt tracking.
+
+Works against any Web3 instance: Sepolia, a local anvil node
+(RPC_URL=http://127.0.0.1:8545) or the in-memory EthereumTesterProvider.
+"""
+
+import heapq
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional
+
+from eth_account import Account
+
+# PyUSD has 6 decimals
+PYUSD_DECIMALS = 6
+DEFAULT_GAS_LIMIT = 100000
+DEFAULT_GAS_PRICE_GWEI = 20
+
+# Substrings of node errors that mean our local nonce view is stale
+NONCE_ERRORS = ("nonce too low", "nonce too high", "already known", "replacement transaction underpriced")
+
+# Fee bump a node requires before it accepts a replacement for the same nonce
+REPLACEMENT_FEE_BUMP = 1.125
+CANCEL_GAS_LIMIT = 21000
+
+
+class NonceManager:
+    """Hands out nonces per wallet without an RPC round trip per payment.
+
+    The first allocation for a wallet syncs from the node's pending count.
+    Nonces that were allocated but never broadcast are released back and
+    reused first, so a failed submission does not leave a gap that would
+    stall every later transaction from the same wallet.
+    """
+
+    def __init__(self, web3):
+        self.web3 = web3
+        self._lock = threading.Lock()
+        self._next: Dict[str, int] = {}
+        self._released: Dict[str, List[int]] = {}
+
+    def _key(self, address: str) -> str:
+        return address.lower()
+
+    def _chain_nonce(self, address: str) -> int:
+        return self.web3.eth.get_transaction_count(
+            self.web3.to_checksum_address(address), 'pending'
+        )
+
+    def allocate(self, address: str) -> int:
+        """Reserve the next nonce for a wallet"""
+        key = self._key(address)
+        with self._lock:
+            released = self._released.get(key)
+            if released:
+                return heapq.heappop(released)
+            if key not in self._next:
+                self._next[key] = self._chain_nonce(address)
+            nonce = self._next[key]
+            self._next[key] = nonce + 1
+            return nonce
+
+    def release(self, address: str, nonce: int):
+        """Return a nonce whose transaction never reached the mempool"""
+        key = self._key(address)
+        with self._lock:
+            if key not in self._next or nonce >= self._next[key]:
+                return
+            heapq.heappush(self._released.setdefault(key, []), nonce)
+
+    def resync(self, address: str) -> int:
+        """Drop local state for a wallet and re-read the pending count"""
+        key = self._key(address)
+        with self._lock:
+            self._next[key] = self._chain_nonce(address)
+            self._released.pop(key, None)
+            return self._next[key]
+
+
+class PendingPayment:
+    """A signed transfer that has been broadcast and awaits its receipt"""
+
+    def __init__(self, tx_hash: str, from_address: str, nonce: int, submitted_at: float,
+                 touched_addresses: Iterable[str] = ()):
+        self.tx_hash = tx_hash
+        self.from_address = from_address
+        self.nonce = nonce
+        self.submitted_at = submitted_at
+        # Addresses whose token balance this transaction changes
+        self.touched_addresses = list(touched_addresses)
+        self.future: Future = Future()
+        # Kept so a stalled transaction's nonce can be replaced
+        self.account = None
+        self.fees: dict = {}
+        # Cancel transactions racing the original for its nonce
+        self.cancel_hashes: List[str] = []
+        self.on_confirmed: Optional[Callable] = None
+        self.on_failed: Optional[Callable] = None
+
+
+class PaymentExecutor:
+    """Submits signed PyUSD transfers without waiting for each to confirm.
+
+    Several transfers from the same wallet can be in flight at once; a
+    single background thread polls for receipts and resolves each payment's
+    future, invoking the optional callbacks with the receipt (or the error).
+    """
+
+    def __init__(
+        self,
+        web3,
+        token_contract,
+        chain_id: int,
+        gas_limit: int = DEFAULT_GAS_LIMIT,
+        fee_params: Optional[Callable[[], dict]] = None,
+        poll_interval: float = 1.0,
+        receipt_timeout: float = 120.0,
+        max_in_flight: int = 32,
+        decimals: int = PYUSD_DECIMALS,
+    ):
+        self.web3 = web3
+        self.token_contract = token_contract
+        self.chain_id = chain_id
+        self.gas_limit = gas_limit
+        self.fee_params = fee_params or self._legacy_fee_params
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+        self.decimals = decimals
+        self.nonces = NonceManager(web3)
+        self._receipt_listeners: List[Callable] = []
+
+        self._pending: Dict[str, PendingPayment] = {}
+        self._pending_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._stop = threading.Event()
+        self._tracker = threading.Thread(target=self._track_receipts, name="receipt-tracker", daemon=True)
+        self._tracker.start()
+
+    def _legacy_fee_params(self) -> dict:
+        return {'gasPrice': self.web3.to_wei(DEFAULT_GAS_PRICE_GWEI, 'gwei')}
+
+    def add_receipt_listener(self, listener: Callable):
+        """Call `listener(payment, receipt)` for every mined transaction,
+        before its future resolves (e.g. to invalidate cached balances)"""
+        self._receipt_listeners.append(listener)
+
+    # Submission
+
+    def submit_transfer(
+        self,
+        from_wallet: dict,
+        to_address: str,
+        amount: float,
+        on_confirmed: Optional[Callable] = None,
+        on_failed: Optional[Callable] = None,
+    ) -> PendingPayment:
+        """Sign and broadcast an ERC-20 transfer; returns immediately"""
+        amount_wei = int(round(amount * (10 ** self.decimals)))
+
+        def build(tx_params: dict) -> dict:
+            return self.token_contract.functions.transfer(
+                self.web3.to_checksum_address(to_address),
+                amount_wei
+            ).build_transaction(tx_params)
+
+        return self.submit(
+            from_wallet,
+            build,
+            touched_addresses=(from_wallet['address'], to_address),
+            on_confirmed=on_confirmed,
+            on_failed=on_failed,
+        )
+
+    def submit(
+        self,
+        from_wallet: dict,
+        build_transaction: Callable[[dict], dict],
+        gas_limit: Optional[int] = None,
+        touched_addresses: Iterable[str] = (),
+        on_confirmed: Optional[Callable] = None,
+        on_failed: Optional[Callable] = None,
+    ) -> PendingPayment:
+        """Sign and broadcast any contract call built by `build_transaction`.
+
+        `build_transaction` receives the base tx params (chainId, gas, fees,
+        nonce, from) and returns the full transaction dict.
+        """
+        account = Account.from_key(from_wallet['private_key'])
+        address = from_wallet['address']
+
+        self._slots.acquire()
+        try:
+            # The first allocation per wallet is an RPC call
+            nonce = self.nonces.allocate(address)
+        except Exception:
+            self._slots.release()
+            raise
+        try:
+            fees = self.fee_params()
+            tx_params = {
+                'chainId': self.chain_id,
+                'gas': gas_limit or self.gas_limit,
+                'nonce': nonce,
+                'from': self.web3.to_checksum_address(address),
+            }
+            tx_params.update(fees)
+            signed_txn = account.sign_transaction(build_transaction(tx_params))
+        except Exception:
+            # Nothing was broadcast, so the nonce is still free
+            self._slots.release()
+            self.nonces.release(address, nonce)
+            raise
+        try:
+            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
+        except Exception:
+            # A nonce error means someone else used this wallet; a transport
+            # error (e.g. a read timeout) may come after the node accepted the
+            # transaction. Either way only the node knows which nonces are taken.
+            self._slots.release()
+            self.nonces.resync(address)
+            raise
+
+        payment = PendingPayment(tx_hash.hex(), address, nonce, time.time(), touched_addresses)
+        payment.account = account
+        payment.fees = fees
+        payment.on_confirmed = on_confirmed
+        payment.on_failed = on_failed
+        with self._pending_lock:
+            self._pending[payment.tx_hash] = payment
+        print(f"📝 Transaction sent: {payment.tx_hash} (nonce {nonce})")
+        return payment
+
+    # Receipt tracking
+
+    def _track_receipts(self):
+        while not self._stop.is_set():
+            with self._pending_lock:
+                pending = sorted(self._pending.values(), key=lambda p: p.nonce)
+
+            for payment in pending:
+                receipt = self._receipt(payment.tx_hash)
+                cancel_receipt = None
+                if receipt is None:
+                    cancel_receipt = next(
+                        filter(None, (self._receipt(cancel_hash) for cancel_hash in payment.cancel_hashes)), None
+                    )
+
+                if receipt is not None:
+                    # The original can still win the nonce race against a cancel
+                    self._resolve(payment, receipt=receipt)
+                elif cancel_receipt is not None:
+                    self._cancelled(payment, cancel_receipt)
+                elif time.time() - payment.submitted_at > self.receipt_timeout:
+                    # Only the wallet's lowest stalled nonce is the gap; the
+                    # ones behind it get a fresh window once it is filled
+                    if not self._has_earlier_pending(payment):
+                        self._expire(payment)
+                        self._restart_followers(payment)
+
+            self._stop.wait(self.poll_interval)
+
+    def _receipt(self, tx_hash: str) -> Optional[dict]:
+        try:
+            return self.web3.eth.get_transaction_receipt(tx_hash)
+        except Exception:
+            return None
+
+    def _has_earlier_pending(self, payment: PendingPayment) -> bool:
+        key = payment.from_address.lower()
+        with self._pending_lock:
+            return any(other.from_address.lower() == key and other.nonce < payment.nonce
+                       for other in self._pending.values())
+
+    def _restart_followers(self, payment: PendingPayment):
+        key = payment.from_address.lower()
+        now = time.time()
+        with self._pending_lock:
+            for other in self._pending.values():
+                if other.from_address.lower() == key and other.nonce > payment.nonce:
+                    other.submitted_at = now
+
+    def _replace_with_cancel(self, payment: PendingPayment) -> str:
+        """Broadcast a 0-value self-transfer with the payment's nonce and
+        bumped fees, so a dropped or underpriced transaction can no longer
+        confirm later and the wallet's next nonces are unblocked"""
+        current = self.fee_params()
+        fees = {
+            key: max(int(value * REPLACEMENT_FEE_BUMP) + 1, current.get(key, 0))
+            for key, value in payment.fees.items()
+        }
+        cancel = {
+            'chainId': self.chain_id,
+            'gas': CANCEL_GAS_LIMIT,
+            'nonce': payment.nonce,
+            'from': self.web3.to_checksum_address(payment.from_address),
+            'to': self.web3.to_checksum_address(payment.from_address),
+            'value': 0,
+        }
+        cancel.update(fees)
+        signed_txn = payment.account.sign_transaction(cancel)
+        cancel_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction).hex()
+        # A further replacement must outbid this one
+        payment.fees = fees
+        payment.cancel_hashes.append(cancel_hash)
+        return cancel_hash
+
+    def _expire(self, payment: PendingPayment):
+        """Handle a payment with no receipt after `receipt_timeout`.
+
+        Its nonce is raced by a cancel transaction; otherwise every later
+        transaction from the wallet would stall behind the gap. The payment
+        stays pending: it confirms if the original is mined after all and
+        fails only once a cancel is mined. A cancel that also stalls is
+        replaced again with higher fees on the next timeout.
+        """
+        try:
+            cancel_hash = self._replace_with_cancel(payment)
+        except Exception as e:
+            if "nonce too low" in str(e).lower():
+                # The nonce was used: by the original or an earlier cancel
+                # (picked up on the next poll), or by someone else
+                if self._receipt(payment.tx_hash) is None and not any(
+                    self._receipt(cancel_hash) for cancel_hash in payment.cancel_hashes
+                ):
+                    self.nonces.resync(payment.from_address)
+                    self._resolve(payment, error=RuntimeError(
+                        f"Nonce {payment.nonce} of {payment.tx_hash} was used by another transaction"
+                    ))
+                return
+            # The original may still be in the mempool; try again next timeout
+            print(f"⚠️ Cancel for {payment.tx_hash} (nonce {payment.nonce}) failed: {e}")
+            payment.submitted_at = time.time()
+            return
+
+        print(f"⚠️ No receipt for {payment.tx_hash} (nonce {payment.nonce}) after {self.receipt_timeout}s, "
+              f"racing cancel transaction {cancel_hash}")
+        payment.submitted_at = time.time()
+
+    def _cancelled(self, payment: PendingPayment, cancel_receipt: dict):
+        self._resolve(payment, error=TimeoutError(
+            f"No receipt for {payment.tx_hash} after {self.receipt_timeout}s; "
+            f"nonce {payment.nonce} taken by cancel transaction {cancel_receipt['transactionHash']}"
+        ))
+
+    def _resolve(self, payment: PendingPayment, receipt=None, error: Optional[Exception] = None):
+        with self._pending_lock:
+            if self._pending.pop(payment.tx_hash, None) is None:
+                return
+        self._slots.release()
+
+        if receipt is not None:
+            for listener in self._receipt_listeners:
+                try:
+                    listener(payment, receipt)
+                except Exception as listener_error:
+                    print(f"⚠️ Receipt listener error: {listener_error}")
+
+        if receipt is not None and receipt['status'] == 1:
+            payment.future.set_result(receipt)
+            callback, arg = payment.on_confirmed, receipt
+        else:
+            if error is None:
+                error = RuntimeError(f"Transaction {payment.tx_hash} reverted")
+            payment.future.set_exception(error)
+            callback, arg = payment.on_failed, error
+
+        if callback:
+            try:
+                callback(payment, arg)
+            except Exception as callback_error:
+                print(f"⚠️ Payment callback error: {callback_error}")
+
+    def in_flight(self) -> int:
+        with self._pending_lock:
+            return len(self._pending)
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted payment has a receipt or timed out"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.in_flight():
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(min(self.poll_interval, 0.1))
+        return True
+
+    def shutdown(self, wait: bool = True):
+        if wait:
+            self.wait_all(self.receipt_timeout)
+        self._stop.set()
+        self._tracker.join(timeout=self.poll_interval * 2)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+FacePay Payment Orchestrator
+Asyncio checkout pipeline that overlaps independent stages of the
+recognise -> pay flow and records per-stage latency.
+
+    recognise ─ wallet lookup ─┬─ user balance ─┬─ submit ─ confirm ─┬─ (deferred) bookkeeping
+                               └─ allowance ────┘                    └─ result
+
+With a SettlementBatcher the submit stage queues the payment instead and
+confirm waits for its chargeBatch receipt.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
+
+import requests
+from web3.logs import DISCARD
+
+from chain_cache import ChainReader
+from payment_executor import PaymentExecutor
+from settlement_batcher import SettlementBatcher
+
+
+def build_wallet_index(wallets: dict) -> Dict[str, dict]:
+    """Lower-cased address -> wallet, replacing a linear scan per checkout"""
+    return {wallet['address'].lower(): wallet for wallet in wallets.values()}
+
+
+class StageTimings:
+    """Collects latency samples per pipeline stage"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    @contextmanager
+    def measure(self, stage: str, into: Optional[dict] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.samples.setdefault(stage, []).append(elapsed_ms)
+            if into is not None:
+                into[stage] = elapsed_ms
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for stage, values in self.samples.items():
+            ordered = sorted(values)
+            result[stage] = {
+                "count": len(ordered),
+                "mean_ms": sum(ordered) / len(ordered),
+                "p50_ms": ordered[len(ordered) // 2],
+                "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            }
+        return result
+
+
+class PaymentOrchestrator:
+    """Runs checkouts with independent chain reads and bookkeeping overlapped.
+
+    Blocking work (HTTP to the DeepFace API, web3 calls) runs in the default
+    thread pool so several checkouts can also proceed concurrently.
+    """
+
+    def __init__(
+        self,
+        api_base_url: str,
+        wallets: dict,
+        merchant_address: str,
+        chain: ChainReader,
+        executor: PaymentExecutor,
+        spender_address: Optional[str] = None,
+        http_timeout: float = 30.0,
+        settlement: Optional[SettlementBatcher] = None,
+    ):
+        self.api_base_url = api_base_url
+        self.wallet_index = build_wallet_index(wallets)
+        self.merchant_address = merchant_address
+        self.chain = chain
+        self.executor = executor
+        self.spender_address = spender_address
+        self.http_timeout = http_timeout
+        self.settlement = settlement
+        self.session = requests.Session()
+        self.timings = StageTimings()
+        self._bookkeeping: Set[asyncio.Task] = set()
+
+    def _recognize(self, image_path: str) -> Optional[dict]:
+        with open(image_path, 'rb') as image_file:
+            response = self.session.post(
+                f"{self.api_base_url}/recognize-face",
+                files={'image': image_file},
+                timeout=self.http_timeout
+            )
+        if response.status_code != 200:
+            return None
+        result = response.json()
+        return result if result.get('success') else None
+
+    async def checkout(self, image_path: str, amount: float) -> dict:
+        """Recognise the customer in `image_path` and charge them `amount`"""
+        stages: Dict[str, float] = {}
+        started = time.perf_counter()
+
+        def fail(reason: str) -> dict:
+            stages["total"] = (time.perf_counter() - started) * 1000
+            return {"success": False, "error": reason, "stages_ms": stages}
+
+        with self.timings.measure("recognize", stages):
+            try:
+                recognition = await asyncio.to_thread(self._recognize, image_path)
+            except Exception as e:
+                return fail(f"Recognition failed: {e}")
+        if not recognition:
+            return fail("Face not recognized")
+
+        with self.timings.measure("wallet_lookup", stages):
+            user_wallet = self.wallet_index.get(recognition['walletAddress'].lower())
+        if not user_wallet:
+            return fail(f"Wallet not found for address: {recognition['walletAddress']}")
+
+        with self.timings.measure("balance_checks", stages):
+            checks = [asyncio.to_thread(self.chain.balance_of, user_wallet['address'])]
+            if self.spender_address:
+                checks.append(asyncio.to_thread(
+                    self.chain.allowance_of, user_wallet['address'], self.spender_address
+                ))
+            try:
+                results = await asyncio.gather(*checks)
+            except Exception as e:
+                return fail(f"Balance check failed: {e}")
+        user_before = results[0]
+
+        if user_before < amount:
+            return fail(f"Insufficient balance. Need {amount} PyUSD, have {user_before}")
+        if self.spender_address and results[1] < amount:
+            return fail(f"Insufficient allowance for {self.spender_address}")
+
+        with self.timings.measure("submit", stages):
+            try:
+                if self.settlement:
+                    payment = await asyncio.to_thread(
+                        self.settlement.add, recognition['userId'], user_wallet['address'], amount,
+                        face_confidence=recognition.get('confidence')
+                    )
+                else:
+                    payment = await asyncio.to_thread(
+                        self.executor.submit_transfer, user_wallet, self.merchant_address, amount
+                    )
+            except Exception as e:
+                return fail(f"Payment submission failed: {e}")
+
+        with self.timings.measure("confirm", stages):
+            try:
+                # A batched payment resolves to its batch's transaction hash
+                outcome = await asyncio.wrap_future(payment.future)
+            except Exception as e:
+                return fail(f"Payment failed: {e}")
+        tx_hash = outcome if self.settlement else payment.tx_hash
+
+        stages["total"] = (time.perf_counter() - started) * 1000
+        self.timings.samples.setdefault("total", []).append(stages["total"])
+
+        # Post-confirmation checks and logging don't gate the customer
+        task = asyncio.ensure_future(self._bookkeep(
+            recognition, user_wallet, amount, tx_hash, None if self.settlement else outcome
+        ))
+        # Finished tasks drop out so a long-running orchestrator doesn't keep them all
+        self._bookkeeping.add(task)
+        task.add_done_callback(self._bookkeeping.discard)
+
+        result = {
+            "success": True,
+            "userId": recognition['userId'],
+            "walletAddress": user_wallet['address'],
+            "transactionHash": tx_hash,
+            "stages_ms": stages,
+        }
+        if self.settlement:
+            result["batched"] = True
+        else:
+            result["blockNumber"] = outcome['blockNumber']
+        return result
+
+    async def _bookkeep(self, recognition: dict, user_wallet: dict, amount: float,
+                        tx_hash: str, receipt: Optional[dict] = None):
+        """Check the receipt's token Transfer logs for this payment.
+
+        Balance deltas can't tell payments apart when checkouts for the same
+        payer or merchant overlap (or share a batch); the Transfer log can.
+        """
+        with self.timings.measure("bookkeeping"):
+            try:
+                if receipt is None:
+                    receipt = await asyncio.to_thread(self.executor.web3.eth.get_transaction_receipt, tx_hash)
+                transfers = self.executor.token_contract.events.Transfer().process_receipt(receipt, errors=DISCARD)
+            except Exception as e:
+                print(f"⚠️ {tx_hash}: could not read Transfer logs: {e}")
+                return
+
+        payer, merchant = user_wallet['address'].lower(), self.merchant_address.lower()
+        amount_wei = int(round(amount * (10 ** self.executor.decimals)))
+        paid = any(
+            event['args']['from'].lower() == payer and event['args']['to'].lower() == merchant
+            and event['args']['value'] == amount_wei
+            for event in transfers
+        )
+        if not paid:
+            print(f"⚠️ {tx_hash}: no Transfer of {amount} PyUSD from {user_wallet['address']} to the merchant")
+        else:
+            print(f"📊 {recognition['userId']} paid {amount} PyUSD ({tx_hash})")
+
+    async def drain(self):
+        """Wait for deferred bookkeeping (call before shutting down)"""
+        if self._bookkeeping:
+            await asyncio.gather(*list(self._bookkeeping), return_exceptions=True)
+
+    def stage_latency(self) -> Dict[str, dict]:
+        return self.timings.summary()
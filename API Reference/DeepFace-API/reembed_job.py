@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+FacePay Re-embedding Job
+Re-embeds the whole gallery under a new DeepFace model into a shadow index
+while live traffic keeps using the active model, then cuts over atomically.
+
+Usage:
+    python reembed_job.py run --model Facenet --workers 4 --batch-size 50
+    python reembed_job.py status --model Facenet
+    python reembed_job.py cutover --model Facenet --threshold 0.3
+    python reembed_job.py cutover --model VGG-Face --threshold 0.4 --unindexed   # roll back
+
+`run` is resumable: progress is checkpointed after every batch, and
+re-running picks up after the last user that was written. `cutover` first
+embeds every user that still has no embedding for the model (registered
+behind the checkpoint cursor, failed, or skipped by a shadow write).
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from supabase import create_client, Client
+
+from face_index import PAGE_SIZE, ModelSettings, embed_image_bytes, store_embeddings
+
+SUPABASE_URL = os.getenv("SUPABASE_URL", "https://nugfkvafpxuaspphxxmd.supabase.co")
+SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")
+DEEPFACE_MODEL = os.getenv("DEEPFACE_MODEL", "VGG-Face")
+DEEPFACE_DETECTOR = os.getenv("DEEPFACE_DETECTOR", "opencv")
+CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.4"))
+
+
+def checkpoint_path(model_name: str, override: Optional[str]) -> str:
+    return override or f"reembed_{model_name.replace('/', '_')}.checkpoint"
+
+
+def load_checkpoint(path: str, model_name: str) -> dict:
+    if os.path.exists(path):
+        with open(path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        if checkpoint.get("model") == model_name:
+            return checkpoint
+    return {"model": model_name, "last_user_id": "", "embedded": 0, "failed": [], "seconds": 0.0}
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file, indent=2)
+    os.replace(temp_path, path)
+
+
+def embed_user(row: dict, model_name: str, detector: str) -> Optional[list]:
+    try:
+        return embed_image_bytes(base64.b64decode(row['face_data']), model_name, detector)
+    except Exception as e:
+        print(f"⚠️ Failed to embed {row['user_id']}: {e}")
+        return None
+
+
+def embed_and_store(supabase: Client, pool: ThreadPoolExecutor, rows: list,
+                    model_name: str, detector: str) -> list:
+    """Embed rows in parallel and store the successful ones; returns per-row results"""
+    results = list(pool.map(lambda row: embed_user(row, model_name, detector), rows))
+    embedded = [(row['user_id'], result) for row, result in zip(rows, results) if result]
+    if embedded:
+        user_ids, embeddings = zip(*embedded)
+        store_embeddings(supabase, list(user_ids), model_name, list(embeddings))
+    return results
+
+
+def _all_user_ids(query) -> set:
+    """user_id column of a query, paginated past the PostgREST row cap"""
+    user_ids, offset = set(), 0
+    while True:
+        rows = query().order('user_id').range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        user_ids.update(row['user_id'] for row in rows)
+        if len(rows) < PAGE_SIZE:
+            return user_ids
+        offset += PAGE_SIZE
+
+
+def missing_user_ids(supabase: Client, model_name: str) -> List[str]:
+    """Registered users without a face_model_embeddings row for the model"""
+    users = _all_user_ids(lambda: supabase.table('face_embeddings').select('user_id'))
+    embedded = _all_user_ids(
+        lambda: supabase.table('face_model_embeddings').select('user_id').eq('model_name', model_name)
+    )
+    return sorted(users - embedded)
+
+
+def run_job(supabase: Client, model_name: str, detector: str, workers: int,
+            batch_size: int, checkpoint_file: str) -> dict:
+    """Back-fill `face_model_embeddings` for `model_name`, resuming from the checkpoint"""
+    settings = ModelSettings(supabase, DEEPFACE_MODEL, CONFIDENCE_THRESHOLD)
+    if settings.active_model == model_name and settings.active_model_indexed:
+        print(f"ℹ️ {model_name} is already the active indexed model")
+    elif settings.shadow_model != model_name:
+        # New registrations are embedded for the shadow model as well from now on
+        settings.update({"shadow_model": model_name})
+        print(f"🌓 Shadow model set to {model_name}")
+
+    checkpoint = load_checkpoint(checkpoint_file, model_name)
+    if checkpoint["last_user_id"]:
+        print(f"♻️ Resuming after user {checkpoint['last_user_id']} ({checkpoint['embedded']} done)")
+
+    started = time.time()
+    previous_seconds = checkpoint["seconds"]
+    embedded_this_run = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            page = supabase.table('face_embeddings') \
+                .select('user_id, face_data') \
+                .gt('user_id', checkpoint["last_user_id"]) \
+                .order('user_id') \
+                .limit(batch_size) \
+                .execute()
+            rows = page.data or []
+            if not rows:
+                break
+
+            results = embed_and_store(supabase, pool, rows, model_name, detector)
+            succeeded = sum(1 for result in results if result)
+
+            checkpoint["failed"].extend(row['user_id'] for row, result in zip(rows, results) if not result)
+            checkpoint["embedded"] += succeeded
+            checkpoint["last_user_id"] = rows[-1]['user_id']
+            checkpoint["seconds"] = previous_seconds + time.time() - started
+            save_checkpoint(checkpoint_file, checkpoint)
+
+            embedded_this_run += succeeded
+            rate = embedded_this_run / max(time.time() - started, 1e-6)
+            print(f"   {checkpoint['embedded']} embedded, {len(checkpoint['failed'])} failed "
+                  f"({rate:.2f} users/s, {workers} workers, batch {batch_size})")
+
+    print(f"✅ Pass complete: {checkpoint['embedded']} embedded, {len(checkpoint['failed'])} failed")
+    return checkpoint
+
+
+def catch_up(supabase: Client, model_name: str, detector: str, workers: int,
+             batch_size: int, checkpoint_file: str) -> List[str]:
+    """Embed every user still missing an embedding for the model.
+
+    The checkpoint cursor only moves forward by user_id, so users registered
+    with a lower id after the pass, failed ones and users whose shadow
+    embedding failed at registration are found by set difference instead.
+    Returns the users that still failed.
+    """
+    missing = missing_user_ids(supabase, model_name)
+    print(f"🔎 {len(missing)} users without a {model_name} embedding")
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(missing), batch_size):
+            page = supabase.table('face_embeddings').select('user_id, face_data') \
+                .in_('user_id', missing[start:start + batch_size]).execute()
+            rows = page.data or []
+            results = embed_and_store(supabase, pool, rows, model_name, detector) if rows else []
+            failed.extend(row['user_id'] for row, result in zip(rows, results) if not result)
+
+    checkpoint = load_checkpoint(checkpoint_file, model_name)
+    checkpoint["embedded"] += len(missing) - len(failed)
+    checkpoint["failed"] = failed
+    save_checkpoint(checkpoint_file, checkpoint)
+    print(f"✅ Catch-up complete: {len(missing) - len(failed)} embedded, {len(failed)} failed")
+    return failed
+
+
+def coverage(supabase: Client, model_name: str) -> dict:
+    users = supabase.table('face_embeddings').select('user_id', count='exact').limit(1).execute()
+    embedded = supabase.table('face_model_embeddings').select('user_id', count='exact') \
+        .eq('model_name', model_name).limit(1).execute()
+    return {"model": model_name, "users": users.count or 0, "embedded": embedded.count or 0}
+
+
+def cutover(supabase: Client, model_name: str, threshold: float, unindexed: bool, force: bool,
+            detector: str, workers: int, batch_size: int, checkpoint_file: str) -> bool:
+    settings = ModelSettings(supabase, DEEPFACE_MODEL, CONFIDENCE_THRESHOLD)
+
+    if not unindexed:
+        # Finish the cursor pass (also sets the shadow model so new
+        # registrations get embedded), then fill whatever it missed
+        run_job(supabase, model_name, detector, workers, batch_size, checkpoint_file)
+        catch_up(supabase, model_name, detector, workers, batch_size, checkpoint_file)
+        status = coverage(supabase, model_name)
+        if status["embedded"] < status["users"] and not force:
+            print(f"❌ Only {status['embedded']}/{status['users']} users embedded; "
+                  f"fix failures or pass --force")
+            return False
+
+    previous = (settings.active_model, settings.active_threshold)
+    settings.update({
+        "active_model": model_name,
+        "active_threshold": str(threshold),
+        "active_model_indexed": "false" if unindexed else "true",
+        "shadow_model": "",
+    })
+    print(f"🔀 Cut over from {previous[0]} (threshold {previous[1]}) to {model_name} (threshold {threshold})")
+    print(f"   API replicas pick this up within {settings.ttl_seconds:.0f}s")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed the face gallery under a new model")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_job_args(command):
+        command.add_argument("--model", required=True, help="DeepFace model to embed with")
+        command.add_argument("--detector", default=DEEPFACE_DETECTOR)
+        command.add_argument("--workers", type=int, default=4, help="Parallel embedding threads")
+        command.add_argument("--batch-size", type=int, default=50, help="Users per page/checkpoint")
+        command.add_argument("--checkpoint", default=None, help="Checkpoint file path")
+
+    add_job_args(subparsers.add_parser("run", help="Back-fill the shadow index (resumable)"))
+
+    status_parser = subparsers.add_parser("status", help="Show shadow index coverage")
+    status_parser.add_argument("--model", required=True)
+
+    cutover_parser = subparsers.add_parser("cutover", help="Atomically switch the active model")
+    add_job_args(cutover_parser)
+    cutover_parser.add_argument("--threshold", type=float, required=True,
+                                help="Cosine distance threshold for the new model (see calibrate_threshold.py)")
+    cutover_parser.add_argument("--unindexed", action="store_true",
+                                help="Use per-user DeepFace.verify instead of the embedding index")
+    cutover_parser.add_argument("--force", action="store_true", help="Cut over with incomplete coverage")
+
+    args = parser.parse_args()
+    supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+
+    if args.command == "run":
+        run_job(supabase, args.model, args.detector, args.workers, args.batch_size,
+                checkpoint_path(args.model, args.checkpoint))
+    elif args.command == "status":
+        status = coverage(supabase, args.model)
+        print(f"📊 {status['model']}: {status['embedded']}/{status['users']} users embedded")
+    elif args.command == "cutover":
+        ok = cutover(supabase, args.model, args.threshold, args.unindexed, args.force, args.detector,
+                     args.workers, args.batch_size, checkpoint_path(args.model, args.checkpoint))
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+FacePay Settlement Batcher
+Collects recognised face payments for a merchant and settles them with a
+single PaymentHub.chargeBatch call per window instead of one transaction
+(and one confirmation wait) per payment.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from web3.logs import DISCARD
+
+from payment_executor import PaymentExecutor
+
+# Gas model: the savings report, and the batch gas limit if estimation fails
+SINGLE_CHARGE_GAS = 80000   # typical PaymentHub.charge incl. 21k base cost
+BATCH_BASE_GAS = 30000
+BATCH_ITEM_GAS = 90000
+# Headroom over estimate_gas: balances can change between estimate and inclusion
+GAS_ESTIMATE_MARGIN = 1.25
+
+PAYMENT_HUB_BATCH_ABI = [
+    {
+        "inputs": [
+            {"name": "customers", "type": "address[]"},
+            {"name": "amounts", "type": "uint256[]"}
+        ],
+        "name": "chargeBatch",
+        "outputs": [{"name": "charged", "type": "uint256"}],
+        "type": "function"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "index", "type": "uint256"},
+            {"indexed": True, "name": "customer", "type": "address"},
+            {"indexed": False, "name": "amount", "type": "uint256"}
+        ],
+        "name": "ChargeSkipped",
+        "type": "event"
+    }
+]
+
+
+class QueuedPayment:
+    """One face payment waiting to be settled in a batch"""
+
+    def __init__(self, from_user_id: str, from_wallet: str, amount: float,
+                 to_user_id: str, face_confidence: Optional[float]):
+        self.from_user_id = from_user_id
+        self.from_wallet = from_wallet
+        self.amount = amount
+        self.to_user_id = to_user_id
+        self.face_confidence = face_confidence
+        self.queued_at = time.time()
+        self.log_id: Optional[str] = None
+        self.future: Future = Future()
+
+
+class SettlementBatcher:
+    """Batches payments to one merchant by size limit or time window.
+
+    Each payment is written to `payment_logs` as pending when it is queued,
+    tagged with its batch id on submission and marked confirmed/failed from
+    the batch receipt; items the
+    contract skipped (no balance/allowance) fail individually without
+    affecting the rest of the batch.
+    """
+
+    def __init__(
+        self,
+        executor: PaymentExecutor,
+        payment_hub_contract,
+        merchant_wallet: dict,
+        supabase=None,
+        max_batch_size: int = 50,
+        window_seconds: float = 5.0,
+    ):
+        self.executor = executor
+        self.payment_hub = payment_hub_contract
+        self.merchant_wallet = merchant_wallet
+        self.supabase = supabase
+        self.max_batch_size = max_batch_size
+        self.window_seconds = window_seconds
+
+        self._queue: List[QueuedPayment] = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "payments": 0,
+            "confirmed": 0,
+            "failed": 0,
+            "gas_used": 0,
+            "queue_wait_seconds": 0.0,
+            "confirm_seconds": 0.0,
+        }
+        self._stop = threading.Event()
+        self._timer = threading.Thread(target=self._window_loop, name="settlement-window", daemon=True)
+        self._timer.start()
+
+    def add(self, from_user_id: str, from_wallet: str, amount: float,
+            to_user_id: str = "merchant", face_confidence: Optional[float] = None) -> QueuedPayment:
+        """Queue a recognised payment; flushes immediately when the batch is full"""
+        payment = QueuedPayment(from_user_id, from_wallet, amount, to_user_id, face_confidence)
+        self._log_pending(payment)
+        with self._lock:
+            self._queue.append(payment)
+            full = len(self._queue) >= self.max_batch_size
+        if full:
+            self.flush()
+        return payment
+
+    def _window_loop(self):
+        while not self._stop.wait(min(self.window_seconds, 0.5)):
+            with self._lock:
+                due = self._queue and time.time() - self._queue[0].queued_at >= self.window_seconds
+            if due:
+                self.flush()
+
+    def flush(self) -> Optional[str]:
+        """Submit everything queued as one chargeBatch; returns the batch id"""
+        with self._lock:
+            batch, self._queue = self._queue[:self.max_batch_size], self._queue[self.max_batch_size:]
+        if not batch:
+            return None
+
+        batch_id = str(uuid.uuid4())
+        submitted_at = time.time()
+        self._log_batch(batch_id, batch)
+
+        customers = [self.executor.web3.to_checksum_address(p.from_wallet) for p in batch]
+        amounts = [int(round(p.amount * (10 ** self.executor.decimals))) for p in batch]
+        print(f"📦 Settling batch {batch_id[:8]} with {len(batch)} payments")
+
+        charge = self.payment_hub.functions.chargeBatch(customers, amounts)
+
+        def build(tx_params: dict) -> dict:
+            return charge.build_transaction(tx_params)
+
+        def on_confirmed(pending, receipt):
+            skipped = {
+                event['args']['index']
+                for event in self.payment_hub.events.ChargeSkipped().process_receipt(receipt, errors=DISCARD)
+            }
+            self._settle(batch_id, batch, submitted_at, pending.tx_hash, receipt['gasUsed'], skipped)
+
+        def on_failed(pending, error):
+            print(f"❌ Batch {batch_id[:8]} failed: {error}")
+            self._settle(batch_id, batch, submitted_at, pending.tx_hash, 0, set(range(len(batch))), error)
+
+        try:
+            self.executor.submit(
+                self.merchant_wallet,
+                build,
+                gas_limit=self._gas_limit(charge, len(batch)),
+                touched_addresses=customers + [self.merchant_wallet['address']],
+                on_confirmed=on_confirmed,
+                on_failed=on_failed,
+            )
+        except Exception as e:
+            print(f"❌ Batch {batch_id[:8]} submission failed: {e}")
+            self._settle(batch_id, batch, submitted_at, None, 0, set(range(len(batch))), e)
+        return batch_id
+
+    def _gas_limit(self, charge, size: int) -> int:
+        try:
+            estimate = charge.estimate_gas({'from': self.merchant_wallet['address']})
+            return int(estimate * GAS_ESTIMATE_MARGIN)
+        except Exception as e:
+            print(f"⚠️ Gas estimation failed ({e}), using the static batch gas model")
+            return BATCH_BASE_GAS + BATCH_ITEM_GAS * size
+
+    def _log_pending(self, payment: QueuedPayment):
+        if not self.supabase:
+            return
+        try:
+            result = self.supabase.table('payment_logs').insert({
+                "from_user_id": payment.from_user_id,
+                "to_user_id": payment.to_user_id,
+                "from_wallet": payment.from_wallet,
+                "to_wallet": self.merchant_wallet['address'],
+                "amount": payment.amount,
+                "status": "pending",
+                "face_confidence": payment.face_confidence,
+            }).execute()
+            if result.data:
+                payment.log_id = result.data[0].get('id')
+        except Exception as e:
+            print(f"⚠️ Failed to log payment from {payment.from_user_id}: {e}")
+
+    def _log_batch(self, batch_id: str, batch: List[QueuedPayment]):
+        log_ids = [p.log_id for p in batch if p.log_id]
+        if not self.supabase or not log_ids:
+            return
+        try:
+            self.supabase.table('payment_logs').update({"batch_id": batch_id}).in_('id', log_ids).execute()
+        except Exception as e:
+            print(f"⚠️ Failed to tag payment logs with batch {batch_id[:8]}: {e}")
+
+    def _log_outcome(self, batch_id: str, batch: List[QueuedPayment], tx_hash: Optional[str], failed: set):
+        if not self.supabase:
+            return
+        try:
+            for status, in_status in (("failed", True), ("confirmed", False)):
+                log_ids = [p.log_id for i, p in enumerate(batch) if (i in failed) == in_status and p.log_id]
+                if log_ids:
+                    self.supabase.table('payment_logs').update(
+                        {"status": status, "transaction_hash": tx_hash}
+                    ).in_('id', log_ids).execute()
+        except Exception as e:
+            print(f"⚠️ Failed to update payment logs for batch {batch_id[:8]}: {e}")
+
+    def _settle(self, batch_id: str, batch: List[QueuedPayment], submitted_at: float,
+                tx_hash: Optional[str], gas_used: int, failed: set, error: Optional[Exception] = None):
+        self._log_outcome(batch_id, batch, tx_hash, failed)
+        confirmed_at = time.time()
+
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["payments"] += len(batch)
+            self._stats["confirmed"] += len(batch) - len(failed)
+            self._stats["failed"] += len(failed)
+            self._stats["gas_used"] += gas_used
+            self._stats["queue_wait_seconds"] += sum(submitted_at - p.queued_at for p in batch)
+            self._stats["confirm_seconds"] += confirmed_at - submitted_at
+
+        for i, payment in enumerate(batch):
+            if i in failed:
+                payment.future.set_exception(error or RuntimeError(
+                    f"Payment from {payment.from_user_id} skipped by PaymentHub"
+                ))
+            else:
+                payment.future.set_result(tx_hash)
+
+        print(f"✅ Batch {batch_id[:8]} settled: {len(batch) - len(failed)} confirmed, {len(failed)} failed")
+
+    def stats(self) -> Dict[str, float]:
+        """Gas and latency of batched settlement versus one charge per payment"""
+        with self._stats_lock:
+            s = dict(self._stats)
+
+        batches = max(s["batches"], 1)
+        payments = max(s["payments"], 1)
+        avg_confirm = s["confirm_seconds"] / batches
+        unbatched_gas = s["payments"] * SINGLE_CHARGE_GAS
+        # Unbatched, one wallet settles payments one confirmation wait at a time;
+        # batched, every payment also waits in the queue for its window
+        sequential_seconds = s["payments"] * avg_confirm
+        batched_seconds = s["confirm_seconds"] + s["queue_wait_seconds"]
+
+        return {
+            **s,
+            "unbatched_gas_estimate": unbatched_gas,
+            "gas_saved": unbatched_gas - s["gas_used"] if s["gas_used"] else 0,
+            "gas_per_payment": s["gas_used"] / payments,
+            "confirmation_waits_saved": s["payments"] - s["batches"],
+            "avg_queue_wait_seconds": s["queue_wait_seconds"] / payments,
+            "avg_confirm_seconds": avg_confirm,
+            "sequential_settlement_seconds": sequential_seconds,
+            "batched_settlement_seconds": batched_seconds,
+            "latency_saved_seconds": sequential_seconds - batched_seconds,
+        }
+
+    def close(self):
+        """Flush what is queued and stop the window timer"""
+        self._stop.set()
+        self._timer.join(timeout=1)
+        while self.flush():
+            pass
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+FacePay Single-Flight Coalescing
+Concurrent calls with the same key share one in-flight computation.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Coalesces identical concurrent requests (asyncio, single event loop).
+
+    The first caller for a key runs `fn`; callers that arrive while it is
+    still running await the same future and get the same result or
+    exception. Nothing is cached once the computation finishes.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, fn: Callable[[], Awaitable]):
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: one waiter disconnecting must not cancel the shared work
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fn())
+        self._in_flight[key] = future
+        self.executed += 1
+        future.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(future)
+
+    def _finish(self, key: str, future: asyncio.Future):
+        self._in_flight.pop(key, None)
+        if not future.cancelled():
+            # Mark the exception retrieved in case every waiter went away
+            future.exception()
+
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+FacePay ONNX Parity Test
+Checks that ONNX Runtime embeddings match TensorFlow/DeepFace within
+tolerance, and compares per-image latency.
+
+Usage:
+    python export_onnx.py --model VGG-Face --quantize
+    python test_onnx_parity.py --model VGG-Face --onnx models/VGG-Face.onnx
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+from inference_backend import OnnxBackend, TensorFlowBackend, quantized_path
+
+# Max cosine distance between TF and ONNX embeddings of the same image
+FP32_TOLERANCE = 1e-4
+INT8_TOLERANCE = 2e-2
+
+
+def cosine_distance(a, b) -> float:
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return float(1.0 - a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def timed_embeddings(backend, images, model_name: str, detector: str):
+    # Warm-up run so model loading isn't counted as inference latency
+    backend.represent(images[0], model_name, detector)
+    embeddings, started = [], time.perf_counter()
+    for image_path in images:
+        embeddings.append(backend.represent(image_path, model_name, detector))
+    return embeddings, (time.perf_counter() - started) * 1000 / len(images)
+
+
+def check_parity(onnx_backend, tf_embeddings, tf_ms, images, model_name, detector, tolerance) -> bool:
+    label = "int8" if onnx_backend.quantized else "fp32"
+    onnx_embeddings, onnx_ms = timed_embeddings(onnx_backend, images, model_name, detector)
+    distances = [cosine_distance(a, b) for a, b in zip(tf_embeddings, onnx_embeddings)]
+
+    print(f"\n📊 ONNX {label} vs TensorFlow ({len(images)} images)")
+    for image_path, distance in zip(images, distances):
+        print(f"   {os.path.basename(image_path)}: cosine distance {distance:.2e}")
+    print(f"   Max distance: {max(distances):.2e} (tolerance {tolerance:.0e})")
+    print(f"   Latency: TensorFlow {tf_ms:.1f} ms/img, ONNX {onnx_ms:.1f} ms/img ({tf_ms / onnx_ms:.2f}x)")
+
+    passed = max(distances) <= tolerance
+    print(f"   {'✅ Parity OK' if passed else '❌ Parity FAILED'}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ONNX and TensorFlow embeddings")
+    parser.add_argument("--model", default=os.getenv("DEEPFACE_MODEL", "VGG-Face"))
+    parser.add_argument("--onnx", default=None, help="Default: models/<model>.onnx")
+    parser.add_argument("--images", default="../Pictures", help="Directory of face images")
+    parser.add_argument("--detector", default=os.getenv("DEEPFACE_DETECTOR", "opencv"))
+    parser.add_argument("--threads", type=int, default=0, help="ONNX intra-op threads")
+    args = parser.parse_args()
+
+    onnx_path = args.onnx or os.path.join("models", f"{args.model}.onnx")
+    images = sorted(
+        path for pattern in ("*.jpg", "*.JPG", "*.jpeg", "*.png")
+        for path in glob.glob(os.path.join(args.images, pattern))
+    )
+    if not images:
+        print(f"❌ No images found in {args.images}")
+        sys.exit(1)
+
+    print("🎭 FacePay ONNX Parity Test")
+    print("=" * 50)
+
+    tf_embeddings, tf_ms = timed_embeddings(TensorFlowBackend(), images, args.model, args.detector)
+
+    results = [check_parity(
+        OnnxBackend(onnx_path, args.model, args.threads), tf_embeddings, tf_ms,
+        images, args.model, args.detector, FP32_TOLERANCE
+    )]
+    if os.path.exists(quantized_path(onnx_path)):
+        results.append(check_parity(
+            OnnxBackend(onnx_path, args.model, args.threads, quantized=True), tf_embeddings, tf_ms,
+            images, args.model, args.detector, INT8_TOLERANCE
+        ))
+
+    if all(results):
+        print("\n✅ All parity checks passed!")
+    else:
+        print("\n❌ Some parity checks failed. Check the logs above.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
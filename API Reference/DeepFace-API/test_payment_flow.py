@@ -4,11 +4,16 @@ FacePay Test Script - Complete Payment Flow
 Tests face recognition and executes PyUSD payment if successful
 """
 
+import os
+import sys
+import asyncio
 import requests
 import json
 import time
-from web3 import Web3
-from eth_account import Account
+from payment_executor import PaymentExecutor
+from chain_cache import ChainReader, FeeOracle, get_web3
+from payment_orchestrator import PaymentOrchestrator, build_wallet_index
+from settlement_batcher import PAYMENT_HUB_BATCH_ABI, SettlementBatcher
 # Configuration moved to environment variables
 
 # Wallet configurations from credentials.md
@@ -27,13 +32,15 @@ WALLETS = {
     }
 }
 
+WALLETS_BY_ADDRESS = build_wallet_index(WALLETS)
+
 # Smart contract addresses (from deployment)
 PAYMENT_HUB_ADDRESS = "0x728d0f06Bf6D63B4bC9ca7C879D042DDAC66e8A3"
 PYUSD_ADDRESS = "0xCaC524BcA292aaade2DF8A05cC58F0a65B1B3bB9"
 
 # Blockchain configuration
-RPC_URL = "https://ethereum-sepolia-rpc.publicnode.com"
-CHAIN_ID = 11155111  # Sepolia
+RPC_URL = os.getenv("RPC_URL", "https://ethereum-sepolia-rpc.publicnode.com")
+CHAIN_ID = int(os.getenv("CHAIN_ID", "11155111"))  # Sepolia
 
 # API configuration
 API_BASE_URL = "http://localhost:8000"
@@ -52,11 +59,27 @@ PYUSD_ABI = [
         "outputs": [{"name": "", "type": "uint256"}],
         "type": "function"
     },
+    {
+        "inputs": [{"name": "owner", "type": "address"}, {"name": "spender", "type": "address"}],
+        "name": "allowance",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "type": "function"
+    },
     {
         "inputs": [],
         "name": "decimals",
         "outputs": [{"name": "", "type": "uint8"}],
         "type": "function"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "from", "type": "address"},
+            {"indexed": True, "name": "to", "type": "address"},
+            {"indexed": False, "name": "value", "type": "uint256"}
+        ],
+        "name": "Transfer",
+        "type": "event"
     }
 ]
 
@@ -76,7 +99,7 @@ PAYMENT_HUB_ABI = [
 
 class FacePayTester:
     def __init__(self):
-        self.web3 = Web3(Web3.HTTPProvider(RPC_URL))
+        self.web3 = get_web3(RPC_URL)
         print(f"🔗 Connected to Sepolia: {self.web3.is_connected()}")
         
         # Initialize contracts
@@ -88,6 +111,17 @@ class FacePayTester:
             address=PAYMENT_HUB_ADDRESS,
             abi=PAYMENT_HUB_ABI
         )
+        self.chain = ChainReader(self.web3, self.pyusd_contract)
+        self.fees = FeeOracle(self.web3)
+        self.executor = PaymentExecutor(
+            self.web3,
+            self.pyusd_contract,
+            CHAIN_ID,
+            fee_params=self.fees.params,
+            decimals=self.chain.decimals()
+        )
+        # Balances of both parties are re-read once our transfer is mined
+        self.chain.attach(self.executor)
         
     def recognize_face(self, image_path: str):
         """Test face recognition using the DeepFace API"""
@@ -122,10 +156,8 @@ class FacePayTester:
     def get_balance(self, address: str):
         """Get PyUSD balance for an address"""
         try:
-            balance_wei = self.pyusd_contract.functions.balanceOf(address).call()
-            # PyUSD has 6 decimals
-            balance = balance_wei / (10 ** 6)
-            return balance
+            # Served from a short-TTL cache; decimals are read once per token
+            return self.chain.balance_of(address)
         except Exception as e:
             print(f"❌ Balance check error: {e}")
             return 0
@@ -135,46 +167,18 @@ class FacePayTester:
         print(f"\n💰 Sending {amount} PyUSD from {from_wallet['address']} to {to_address}")
         
         try:
-            # Get account
-            account = Account.from_key(from_wallet['private_key'])
-            
-            # Convert amount to wei (6 decimals for PyUSD)
-            amount_wei = int(amount * (10 ** 6))
-            
-            # Build transaction
-            nonce = self.web3.eth.get_transaction_count(from_wallet['address'])
-            
-            transaction = self.pyusd_contract.functions.transfer(
-                to_address,
-                amount_wei
-            ).build_transaction({
-                'chainId': CHAIN_ID,
-                'gas': 100000,
-                'gasPrice': self.web3.to_wei('20', 'gwei'),
-                'nonce': nonce,
-                'from': from_wallet['address']
-            })
-            
-            # Sign transaction
-            signed_txn = account.sign_transaction(transaction)
-            
-            # Send transaction
-            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            print(f"📝 Transaction sent: {tx_hash.hex()}")
+            # Nonce comes from the executor's local allocator, not an RPC per payment
+            payment = self.executor.submit_transfer(from_wallet, to_address, amount)
             
             # Wait for confirmation
             print("⏳ Waiting for confirmation...")
-            receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+            receipt = payment.future.result(timeout=self.executor.receipt_timeout + 5)
             
-            if receipt.status == 1:
-                print(f"✅ Payment successful!")
-                print(f"   Transaction Hash: {tx_hash.hex()}")
-                print(f"   Block: {receipt.blockNumber}")
-                print(f"   Gas Used: {receipt.gasUsed}")
-                return tx_hash.hex()
-            else:
-                print(f"❌ Transaction failed")
-                return None
+            print(f"✅ Payment successful!")
+            print(f"   Transaction Hash: {payment.tx_hash}")
+            print(f"   Block: {receipt['blockNumber']}")
+            print(f"   Gas Used: {receipt['gasUsed']}")
+            return payment.tx_hash
                 
         except Exception as e:
             print(f"❌ Payment error: {e}")
@@ -195,11 +199,7 @@ class FacePayTester:
         user_wallet_address = recognition_result['walletAddress']
         
         # Find the wallet info
-        user_wallet = None
-        for wallet_name, wallet_info in WALLETS.items():
-            if wallet_info['address'].lower() == user_wallet_address.lower():
-                user_wallet = wallet_info
-                break
+        user_wallet = WALLETS_BY_ADDRESS.get(user_wallet_address.lower())
         
         if not user_wallet:
             print(f"❌ Wallet not found for address: {user_wallet_address}")
@@ -254,6 +254,48 @@ class FacePayTester:
             print("⚠️ Payment amounts don't match expected values")
         
         return success
+    
+    async def test_pipelined_flow(self, image_path: str, amount: float = 1.0, batched: bool = False):
+        """Test the FacePay flow with overlapped stages and per-stage latency.
+        With `batched`, the payment settles through PaymentHub.chargeBatch
+        (the customer must have approved the PaymentHub)."""
+        print(f"🚀 Starting pipelined FacePay Test Flow{' (batched settlement)' if batched else ''}")
+        print("=" * 50)
+        
+        settlement = None
+        if batched:
+            settlement = SettlementBatcher(
+                self.executor,
+                self.web3.eth.contract(address=PAYMENT_HUB_ADDRESS, abi=PAYMENT_HUB_BATCH_ABI),
+                WALLETS['merchant'],
+                window_seconds=1.0
+            )
+        orchestrator = PaymentOrchestrator(
+            API_BASE_URL,
+            WALLETS,
+            WALLETS['merchant']['address'],
+            self.chain,
+            self.executor,
+            spender_address=PAYMENT_HUB_ADDRESS if batched else None,
+            settlement=settlement
+        )
+        result = await orchestrator.checkout(image_path, amount)
+        await orchestrator.drain()
+        if settlement:
+            settlement.close()
+            stats = settlement.stats()
+            print(f"📦 Batch gas used: {stats['gas_used']}, queue wait {stats['avg_queue_wait_seconds']:.2f}s")
+        
+        if result['success']:
+            print(f"✅ Paid {amount} PyUSD: {result['transactionHash']}")
+        else:
+            print(f"❌ {result['error']}")
+        
+        print("\n⏱️ Stage latency:")
+        for stage, elapsed_ms in result['stages_ms'].items():
+            print(f"   {stage}: {elapsed_ms:.1f} ms")
+        
+        return result['success']
 
 def main():
     """Main test function"""
@@ -267,7 +309,12 @@ def main():
     image_path = "../Pictures/test.JPG"
     amount = 1.0  # 1 PyUSD
     
-    success = tester.test_complete_flow(image_path, amount)
+    if "--pipelined" in sys.argv or "--batched" in sys.argv:
+        success = asyncio.run(tester.test_pipelined_flow(image_path, amount, batched="--batched" in sys.argv))
+    else:
+        success = tester.test_complete_flow(image_path, amount)
+    tester.executor.shutdown()
+    tester.fees.stop()
     
     if success:
         print("\n✅ All tests passed! FacePay is working correctly.")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+FacePay Settlement Batcher Test
+Settles face payments through settlement_batcher.py against the in-memory
+chain, PaymentHub and Supabase in local_standins.py (no RPC or Sepolia
+funds needed).
+
+Usage:
+    python test_settlement_batcher.py
+"""
+
+import sys
+
+from local_standins import InMemoryChain, InMemorySupabase, future_outcome
+from payment_executor import PaymentExecutor
+from settlement_batcher import SettlementBatcher
+
+
+def test_batch_settlement():
+    """Payments settle in one chargeBatch; a payer without allowance fails alone"""
+    print("\n🧪 Batched settlement")
+    chain = InMemoryChain(block_time=0.05)
+    hub = chain.payment_hub()
+    supabase = InMemorySupabase()
+    executor = PaymentExecutor(chain, chain.token, chain.chain_id,
+                               fee_params=lambda: {"gasPrice": 10 ** 9}, poll_interval=0.05)
+    merchant = chain.funded_wallet()
+    payers = [chain.funded_wallet() for _ in range(4)]
+    for payer in payers[:3]:
+        chain.approve(payer["address"], hub.address, 10 ** 12)
+
+    gas_limits = []
+    submit = executor.submit
+
+    def recording_submit(*args, **kwargs):
+        gas_limits.append(kwargs["gas_limit"])
+        return submit(*args, **kwargs)
+
+    executor.submit = recording_submit
+
+    batcher = SettlementBatcher(executor, hub, merchant, supabase=supabase, window_seconds=3600)
+    try:
+        queued = [batcher.add(f"user{i}", payer["address"], 2.0) for i, payer in enumerate(payers)]
+        logged = supabase.table('payment_logs').select('*').eq('status', 'pending').execute().data
+        print(f"   Pending payment_logs rows before flush: {len(logged)}")
+
+        batcher.flush()
+        outcomes = [future_outcome(payment.future, timeout=10) for payment in queued]
+        rows = supabase.table('payment_logs').select('*').execute().data
+        statuses = sorted(row["status"] for row in rows)
+        batch_ids = {row.get("batch_id") for row in rows}
+        print(f"   Outcomes {outcomes}, payment_logs {statuses}, batch ids {len(batch_ids)}")
+
+        stats = batcher.stats()
+        print(f"   Gas limit {gas_limits}, used {stats['gas_used']}, "
+              f"latency saved {stats['latency_saved_seconds']:.2f}s "
+              f"(queue wait {stats['queue_wait_seconds']:.2f}s)")
+
+        assert len(logged) == 4, "pending rows must be written when payments are queued"
+        assert outcomes == ["confirmed"] * 3 + ["RuntimeError"]
+        assert statuses == ["confirmed"] * 3 + ["failed"]
+        assert len(batch_ids) == 1 and None not in batch_ids
+        assert chain.balance_of(merchant["address"]) == 10 ** 12 + 3 * 2 * 10 ** 6
+        assert len(gas_limits) == 1 and stats["gas_used"] < gas_limits[0]
+        assert abs(stats["latency_saved_seconds"] - (stats["sequential_settlement_seconds"]
+                   - stats["confirm_seconds"] - stats["queue_wait_seconds"])) < 1e-9
+    finally:
+        batcher.close()
+        executor.shutdown(wait=False)
+        chain.stop()
+    print("   ✅ Passed")
+
+
+def main():
+    print("🎭 FacePay Settlement Batcher Test")
+    print("=" * 50)
+    failed = 0
+    for check in (test_batch_settlement,):
+        try:
+            check()
+        except AssertionError as e:
+            print(f"   ❌ FAILED {e}")
+            failed += 1
+    if failed:
+        print("\n❌ Some settlement batcher checks failed. Check the logs above.")
+        sys.exit(1)
+    print("\n✅ All settlement batcher checks passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,12 @@ contract PaymentHub {
         uint256 timestamp
     );
     
+    event ChargeSkipped(
+        uint256 indexed index,
+        address indexed customer,
+        uint256 amount
+    );
+    
     event ApprovalSet(
         address indexed user,
         uint256 amount
@@ -35,6 +41,7 @@ contract PaymentHub {
     error TransferFailed();
     error ZeroAmount();
     error ZeroAddress();
+    error LengthMismatch();
     
     /**
      * @dev Constructor sets the PYUSD contract address
@@ -72,6 +79,49 @@ contract PaymentHub {
         emit Charged(customer, merchant, amount, block.timestamp);
     }
     
+    /**
+     * @dev Charge several customers in one transaction (merchant settlement)
+     * @notice Items that would fail are skipped with ChargeSkipped instead of
+     *         reverting the whole batch
+     * @param customers Addresses of the customers to charge
+     * @param amounts Amounts of PYUSD to charge, index-aligned with customers
+     * @return charged Number of items that were transferred
+     */
+    function chargeBatch(address[] calldata customers, uint256[] calldata amounts) external returns (uint256 charged) {
+        if (customers.length != amounts.length) revert LengthMismatch();
+        
+        address merchant = msg.sender;
+        
+        for (uint256 i = 0; i < customers.length; i++) {
+            address customer = customers[i];
+            uint256 amount = amounts[i];
+            
+            if (
+                customer == address(0) ||
+                amount == 0 ||
+                pyusd.balanceOf(customer) < amount ||
+                pyusd.allowance(customer, address(this)) < amount
+            ) {
+                emit ChargeSkipped(i, customer, amount);
+                continue;
+            }
+            
+            // A token that returns false or reverts only skips this item
+            try pyusd.transferFrom(customer, merchant, amount) returns (bool success) {
+                if (!success) {
+                    emit ChargeSkipped(i, customer, amount);
+                    continue;
+                }
+            } catch {
+                emit ChargeSkipped(i, customer, amount);
+                continue;
+            }
+            
+            charged++;
+            emit Charged(customer, merchant, amount, block.timestamp);
+        }
+    }
+    
     /**
      * @dev Check if customer has approved sufficient amount
      * @param customer Customer address